@@ -1,6 +1,14 @@
 """Jook: A Jamf Pro webhook simulator"""
-from .models.webhooks import Computer, MobileDevice, JamfPro, PatchTitle
+from .compression import Compressor
+from .models.webhooks import (
+    Computer, MobileDevice, JamfPro, PatchTitle, SmartGroup, Jook,
+    PreparedWebhook
+)
 from .models.data_sets import DeviceData, LocationData
+from .models.fleet import Fleet
+from .models.shared import SharedFleet
+from .senders import Sender, AsyncSender
+from .shapes import PayloadShape
 
 
 __title__ = 'jook'
@@ -0,0 +1,147 @@
+"""
+This module contains the request body compressor for webhook objects.
+"""
+import threading
+import timeit
+import zlib
+
+from .exceptions import InvalidMode
+
+# zlib ``wbits`` values for the supported ``Content-Encoding`` values. Adding
+# 16 to the window size makes zlib write a gzip header and trailer.
+ENCODING_WBITS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS
+}
+
+
+class CompressionStats(object):
+    """Running totals for the bodies handled by a :class:`Compressor`."""
+    def __init__(self):
+        self.bodies = 0
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        # Wall-clock time spent in zlib, which includes any time compressing
+        # threads spend waiting on each other.
+        self.compress_seconds = 0.0
+
+    @property
+    def bytes_saved(self):
+        """Return the number of bytes not sent because of compression."""
+        return self.bytes_in - self.bytes_out
+
+    @property
+    def ratio(self):
+        """Return the ratio of bytes sent to bytes generated."""
+        return float(self.bytes_out) / self.bytes_in if self.bytes_in else 1.0
+
+    def as_dict(self):
+        """Return the stats as a dictionary.
+
+        :rtype: dict
+        """
+        return {
+            'bodies': self.bodies,
+            'compressed': self.compressed,
+            'bytesIn': self.bytes_in,
+            'bytesOut': self.bytes_out,
+            'bytesSaved': self.bytes_saved,
+            'compressSeconds': self.compress_seconds
+        }
+
+
+class Compressor(object):
+    """Compresses request bodies and sets the matching ``Content-Encoding``.
+
+    A single compressor may be shared between any number of webhook objects
+    so that its :attr:`stats` cover all of them.
+    """
+    def __init__(self, encoding='gzip', level=6, threshold=1024, workers=1):
+        """
+        :param str encoding: The ``Content-Encoding`` to apply. Can only be
+            'gzip' or 'deflate'.
+
+        :param int level: The zlib compression level (``1`` to ``9``).
+
+        :param int threshold: Bodies smaller than this number of bytes are
+            sent uncompressed.
+
+        :param int workers: The number of threads used by
+            :func:`compress_many() <jook.compression.Compressor.compress_many>`,
+            which :func:`Jook.prepare() <jook.models.webhooks.Jook.prepare>`
+            uses for the bodies of a group. zlib releases the GIL while
+            compressing, so large batches are compressed in parallel.
+
+        :raises InvalidMode:
+        """
+        if encoding not in ENCODING_WBITS:
+            raise InvalidMode("Must be 'gzip' or 'deflate'")
+
+        self.encoding = encoding
+        self.level = int(level)
+        self.threshold = int(threshold)
+        self.workers = int(workers)
+        self.stats = CompressionStats()
+
+        self._wbits = ENCODING_WBITS[encoding]
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def compress(self, body):
+        """Compress a request body if it meets the size threshold.
+
+        :param str body: The encoded request body.
+
+        :return: The body to send and the ``Content-Encoding`` for it, which is
+            ``None`` if the body was not compressed.
+        :rtype: tuple
+        """
+        size = len(body)
+
+        if size < self.threshold:
+            with self._lock:
+                self.stats.bodies += 1
+                self.stats.bytes_in += size
+                self.stats.bytes_out += size
+            return body, None
+
+        start = timeit.default_timer()
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, self._wbits)
+        compressed = compressor.compress(body) + compressor.flush()
+        elapsed = timeit.default_timer() - start
+
+        with self._lock:
+            self.stats.bodies += 1
+            self.stats.compressed += 1
+            self.stats.bytes_in += size
+            self.stats.bytes_out += len(compressed)
+            self.stats.compress_seconds += elapsed
+
+        return compressed, self.encoding
+
+    def compress_many(self, bodies):
+        """Compress a batch of request bodies, using the worker pool when
+        ``workers`` is greater than one.
+
+        :param list bodies: Encoded request bodies.
+
+        :return: A list of ``(body, encoding)`` tuples in the same order as
+            ``bodies``.
+        :rtype: list
+        """
+        if self.workers < 2:
+            return [self.compress(body) for body in bodies]
+
+        if self._pool is None:
+            from multiprocessing.pool import ThreadPool
+            self._pool = ThreadPool(self.workers)
+
+        return self._pool.map(self.compress, bodies)
+
+    def close(self):
+        """Shut down the worker pool if one was started."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
@@ -0,0 +1,387 @@
+"""
+This module contains a coordinator and workers for generating load from many
+processes or machines.
+
+The coordinator gives each worker a seed and a share of the fleet and sends
+each worker its task. Workers fire the scenario at the receiver and
+stream compact latency histograms back, which the coordinator merges.
+
+Messages are JSON objects, one per line, over a TCP connection:
+
+* worker -> coordinator: ``{"type": "hello", "name": ...}``
+* coordinator -> worker: ``{"type": "task", "task": {...}}``
+* worker -> coordinator: ``{"type": "stats", "stats": {...}}`` (repeated)
+* worker -> coordinator: ``{"type": "done"}`` or
+  ``{"type": "error", "message": ...}``
+
+Workers can be started on other machines with::
+
+    $ python -m jook.distributed HOST PORT
+"""
+import json
+import socket
+import threading
+import timeit
+from collections import namedtuple
+
+from .exceptions import JookException
+from .models import webhooks
+from .models.fleet import Fleet
+from .soak import Soak
+from .stats import LatencyStats
+
+WEBHOOK_CLASSES = {
+    'Computer': webhooks.Computer,
+    'MobileDevice': webhooks.MobileDevice,
+    'JamfPro': webhooks.JamfPro,
+    'PatchTitle': webhooks.PatchTitle,
+    'SmartGroup': webhooks.SmartGroup
+}
+
+DistributedResult = namedtuple(
+    'DistributedResult', ('stats', 'workers', 'elapsed'))
+
+
+def _send(sock, message):
+    """Write one message to a socket."""
+    sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+
+
+def _messages(sock):
+    """Yield the messages read from a socket until it is closed."""
+    reader = sock.makefile('rb')
+    try:
+        for line in reader:
+            if line.strip():
+                yield json.loads(line.decode('utf-8'))
+    finally:
+        reader.close()
+
+
+def build_webhook(scenario, fleet=None):
+    """Create the webhook object for a scenario.
+
+    :param dict scenario: ``webhook`` (a class name from ``WEBHOOK_CLASSES``),
+        ``url``, ``event`` and any other keyword arguments for the class.
+
+    :param Fleet fleet: An optional fleet for device and Smart Group
+        webhooks.
+
+    :rtype: BaseWebhook
+
+    :raises JookException: The webhook class is not known.
+    """
+    kwargs = dict(scenario)
+    name = kwargs.pop('webhook')
+
+    try:
+        cls = WEBHOOK_CLASSES[name]
+    except KeyError:
+        raise JookException('Unknown webhook class: {}'.format(name))
+
+    if fleet is not None and issubclass(
+            cls, (webhooks.BaseDevice, webhooks.SmartGroup)):
+        kwargs['fleet'] = fleet
+
+    return cls(**kwargs)
+
+
+class Coordinator(object):
+    """Partitions a fleet across workers and aggregates their stats."""
+    def __init__(self, scenario, workers, fleet_size=0, fleet_options=None,
+                 rate=0, duration=None, count=None, seed=0, report_interval=1.0,
+                 host='127.0.0.1', port=0, concurrency=10):
+        """
+        :param dict scenario: The webhook to fire (see :func:`build_webhook()
+            <jook.distributed.build_webhook>`). Must be JSON serializable.
+
+        :param int workers: The number of workers to wait for.
+
+        :param int fleet_size: The total number of devices. Each worker gets
+            an equal range of device indexes, except with a 'zipf'
+            distribution: workers send an equal share of events, which would
+            give every range the same weight, so instead every worker picks
+            from the whole fleet and the combined picks follow one Zipf
+            curve. ``0`` sends no fleet. Fleets split into ranges need at
+            least one device per worker, and cannot grow because a range
+            would grow into the next worker's.
+
+        :param dict fleet_options: Extra :class:`Fleet
+            <jook.models.fleet.Fleet>` keyword arguments (e.g.
+            ``distribution``, ``skew``, ``realistic``).
+
+        :param float rate: Total events per second across all workers. ``0``
+            fires as fast as possible.
+
+        :param float duration: Seconds each worker fires for.
+
+        :param int count: Total events to fire, split between workers.
+
+        :param int seed: Base seed. Worker ``n`` picks devices with
+            ``seed + n``, and every worker generates the device at each fleet
+            index from ``seed``, so a device has the same identifiers in every
+            worker and run.
+
+        :param float report_interval: Seconds between stats reports from each
+            worker.
+
+        :param str host: The address to listen on.
+
+        :param int port: The port to listen on (``0`` picks a free port).
+
+        :param int concurrency: The most requests each worker has in flight
+            at once.
+
+        :raises JookException: Neither ``duration`` nor ``count`` was given,
+            or a fleet split into ranges is smaller than ``workers`` or has
+            ``growth`` set.
+        """
+        if duration is None and count is None:
+            raise JookException('A duration or count is required')
+
+        fleet_options = fleet_options or {}
+        if fleet_size and fleet_options.get('distribution') != 'zipf':
+            if int(fleet_size) < int(workers):
+                raise JookException(
+                    'The fleet must have at least one device per worker')
+            if fleet_options.get('growth'):
+                raise JookException(
+                    "Fleet growth requires the 'zipf' distribution when "
+                    "the fleet is split between workers")
+
+        self.scenario = scenario
+        self.workers = int(workers)
+        self.fleet_size = int(fleet_size)
+        self.fleet_options = fleet_options
+        self.rate = float(rate)
+        self.duration = duration
+        self.count = count
+        self.seed = seed
+        self.report_interval = report_interval
+        self.concurrency = int(concurrency)
+
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.listen(self.workers)
+
+    @property
+    def address(self):
+        """Return the ``(host, port)`` the coordinator is listening on."""
+        return self._sock.getsockname()
+
+    def tasks(self):
+        """Return the task for each worker.
+
+        :rtype: list
+        """
+        zipf = self.fleet_options.get('distribution') == 'zipf'
+
+        tasks = []
+        for number in range(self.workers):
+            if zipf:
+                start, end = 0, self.fleet_size
+            else:
+                start = self.fleet_size * number // self.workers
+                end = self.fleet_size * (number + 1) // self.workers
+
+            count = None
+            if self.count is not None:
+                count = self.count * (number + 1) // self.workers - \
+                    self.count * number // self.workers
+
+            fleet = None
+            if self.fleet_size:
+                fleet = dict(self.fleet_options, offset=start, size=end - start)
+
+            tasks.append({
+                'scenario': self.scenario,
+                'fleet': fleet,
+                'seed': self.seed + number,
+                'device_seed': self.seed,
+                'rate': self.rate / self.workers,
+                'duration': self.duration,
+                'count': count,
+                'concurrency': self.concurrency,
+                'report_interval': self.report_interval
+            })
+
+        return tasks
+
+    def _collect(self, name, sock, stats, worker_stats, errors):
+        """Read and merge the messages from one worker."""
+        try:
+            for message in _messages(sock):
+                if message['type'] == 'stats':
+                    report = LatencyStats.from_compact(message['stats'])
+                    stats.merge(report)
+                    worker_stats[name].merge(report)
+                elif message['type'] == 'error':
+                    errors.append('{}: {}'.format(name, message['message']))
+                    break
+                elif message['type'] == 'done':
+                    break
+            else:
+                errors.append('{}: disconnected'.format(name))
+        finally:
+            sock.close()
+
+    def run(self, timeout=None):
+        """Wait for the workers, send their tasks and collect their stats
+        until every worker has finished.
+
+        :param float timeout: Optional seconds to wait for each worker to
+            connect.
+
+        :rtype: DistributedResult
+
+        :raises JookException: A worker failed or disconnected.
+        """
+        self._sock.settimeout(timeout)
+        connections = []
+
+        try:
+            while len(connections) < self.workers:
+                sock, _ = self._sock.accept()
+                sock.settimeout(None)
+                hello = next(_messages(sock))
+                name = hello.get('name') or str(len(connections))
+                connections.append((name, sock))
+        except socket.timeout:
+            for _, sock in connections:
+                sock.close()
+            raise JookException('Timed out waiting for workers')
+        finally:
+            self._sock.close()
+
+        stats = LatencyStats()
+        worker_stats = dict((name, LatencyStats()) for name, _ in connections)
+        errors = []
+        start = timeit.default_timer()
+
+        threads = []
+        for (name, sock), task in zip(connections, self.tasks()):
+            _send(sock, {'type': 'task', 'task': task})
+            thread = threading.Thread(
+                target=self._collect,
+                args=(name, sock, stats, worker_stats, errors))
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise JookException('Workers failed: {}'.format('; '.join(errors)))
+
+        return DistributedResult(
+            stats, worker_stats, timeit.default_timer() - start)
+
+
+class Worker(object):
+    """Connects to a coordinator, runs its task and reports stats."""
+    def __init__(self, host, port, name=None, sender=None):
+        """
+        :param str host: The coordinator's address.
+
+        :param int port: The coordinator's port.
+
+        :param str name: An optional name reported to the coordinator.
+            Defaults to ``hostname:pid``.
+
+        :param sender: The sender to use. Defaults to a
+            :class:`Sender <jook.senders.Sender>`.
+        """
+        import os
+
+        self.host = host
+        self.port = int(port)
+        self.name = name or '{}:{}'.format(socket.gethostname(), os.getpid())
+        self.sender = sender
+
+    def run(self):
+        """Run one task from the coordinator."""
+        sock = socket.create_connection((self.host, self.port))
+        try:
+            _send(sock, {'type': 'hello', 'name': self.name})
+            message = next(_messages(sock))
+            try:
+                self.execute(message['task'], sock)
+            except Exception as err:
+                _send(sock, {'type': 'error', 'message': str(err)})
+            else:
+                _send(sock, {'type': 'done'})
+        finally:
+            sock.close()
+
+    def execute(self, task, sock):
+        """Fire a task's scenario with a :class:`Soak <jook.soak.Soak>`,
+        sending stats to the coordinator every ``report_interval`` seconds.
+
+        :param dict task:
+        :param socket sock: The connection to the coordinator.
+        """
+        fleet = None
+        if task['fleet']:
+            options = dict(task['fleet'])
+            fleet = Fleet(
+                options.pop('size'), seed=task['seed'],
+                device_seed=task['device_seed'], **options)
+
+        soak = _ReportingSoak(
+            sock, build_webhook(task['scenario'], fleet), sender=self.sender,
+            rate=task['rate'] or None, window=task['report_interval'],
+            concurrency=task['concurrency'], history=1)
+        soak.run(duration=task['duration'], count=task['count'])
+
+
+class _ReportingSoak(Soak):
+    """A soak that sends each window's stats to the coordinator."""
+    def __init__(self, sock, *args, **kwargs):
+        super(_ReportingSoak, self).__init__(*args, **kwargs)
+        self._sock = sock
+
+    def rollup(self, elapsed, window_seconds, rate):
+        with self._lock:
+            _send(self._sock, {'type': 'stats', 'stats': self.stats.compact()})
+            return super(_ReportingSoak, self).rollup(
+                elapsed, window_seconds, rate)
+
+
+def _run_worker(host, port, name):
+    """Entry point for :func:`start_local_workers()`."""
+    Worker(host, port, name=name).run()
+
+
+def start_local_workers(address, count):
+    """Start worker processes on this machine.
+
+    :param tuple address: The coordinator's ``(host, port)``.
+
+    :param int count: The number of workers to start.
+
+    :return: The started processes
+    :rtype: list
+    """
+    import multiprocessing
+
+    processes = [
+        multiprocessing.Process(
+            target=_run_worker,
+            args=(address[0], address[1], 'local-{}'.format(number)))
+        for number in range(count)
+    ]
+    for process in processes:
+        process.daemon = True
+        process.start()
+
+    return processes
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) != 3:
+        sys.exit('usage: python -m jook.distributed HOST PORT')
+
+    Worker(sys.argv[1], sys.argv[2]).run()
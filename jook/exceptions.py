@@ -21,3 +21,11 @@ class InvalidMode(JookException):
 
 class InvalidURL(JookException):
     """The URL provided does not contain a scheme."""
+
+
+class MissingDependency(JookException):
+    """An optional dependency required by a feature is not installed."""
+
+
+class ReceiverError(JookException):
+    """The receiver returned an error status."""
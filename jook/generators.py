@@ -0,0 +1,259 @@
+"""
+This module contains functions for generating realistic device attributes and
+location data.
+
+Values are drawn from lookup tables that are built once and interned, so a
+large fleet shares the same string objects instead of holding its own copies.
+"""
+import random
+from collections import namedtuple
+
+from .exceptions import InvalidMode
+
+try:
+    intern
+except NameError:
+    from sys import intern
+
+Model = namedtuple('Model', ('identifier', 'name', 'family'))
+
+OperatingSystem = namedtuple('OperatingSystem', ('version', 'build'))
+
+FIRST_NAMES = (
+    'Aaron', 'Abigail', 'Adam', 'Alex', 'Amy', 'Andrew', 'Anna', 'Ben',
+    'Carlos', 'Chloe', 'Chris', 'Daniel', 'David', 'Diana', 'Elena', 'Emily',
+    'Eric', 'Fatima', 'Grace', 'Hannah', 'Hiro', 'Isaac', 'Jack', 'James',
+    'Jane', 'Jasmine', 'John', 'Julia', 'Kevin', 'Laura', 'Liam', 'Maria',
+    'Mark', 'Mei', 'Michael', 'Nina', 'Noah', 'Olivia', 'Omar', 'Priya',
+    'Rachel', 'Ryan', 'Sam', 'Sara', 'Sofia', 'Tom', 'Victor', 'Zoe'
+)
+
+LAST_NAMES = (
+    'Adams', 'Ahmed', 'Allen', 'Baker', 'Brown', 'Campbell', 'Chen', 'Clark',
+    'Davis', 'Diaz', 'Evans', 'Garcia', 'Green', 'Hall', 'Harris', 'Hill',
+    'Ito', 'Jackson', 'Johnson', 'Jones', 'Kim', 'King', 'Lee', 'Lewis',
+    'Lopez', 'Martin', 'Miller', 'Moore', 'Nguyen', 'Patel', 'Perez', 'Roberts',
+    'Robinson', 'Sanchez', 'Scott', 'Singh', 'Smith', 'Taylor', 'Thomas',
+    'Thompson', 'Walker', 'White', 'Williams', 'Wilson', 'Wong', 'Wright',
+    'Young', 'Zhang'
+)
+
+DEPARTMENTS = (
+    'Engineering', 'Finance', 'Human Resources', 'IT', 'Legal', 'Marketing',
+    'Operations', 'Sales', 'Support', 'Design'
+)
+
+POSITIONS = (
+    'Analyst', 'Associate', 'Director', 'Engineer', 'Manager', 'Specialist',
+    'Technician', 'Administrator'
+)
+
+BUILDINGS = (
+    'Headquarters', 'North Campus', 'South Campus', 'Warehouse',
+    'Downtown Office', 'Data Center'
+)
+
+EMAIL_DOMAIN = 'example.org'
+
+COMPUTER_MODELS = (
+    Model('MacBookAir7,2', 'MacBook Air (13-inch, 2017)', 'MacBook Air'),
+    Model('MacBookAir8,1', 'MacBook Air (Retina, 13-inch, 2018)',
+          'MacBook Air'),
+    Model('MacBookPro13,1', 'MacBook Pro (13-inch, 2016)', 'MacBook Pro'),
+    Model('MacBookPro14,1', 'MacBook Pro (13-inch, 2017)', 'MacBook Pro'),
+    Model('MacBookPro15,1', 'MacBook Pro (15-inch, 2018)', 'MacBook Pro'),
+    Model('MacBookPro16,1', 'MacBook Pro (16-inch, 2019)', 'MacBook Pro'),
+    Model('iMac18,3', 'iMac (Retina 5K, 27-inch, 2017)', 'iMac'),
+    Model('iMac19,1', 'iMac (Retina 5K, 27-inch, 2019)', 'iMac'),
+    Model('Macmini8,1', 'Mac mini (2018)', 'Mac mini'),
+    Model('MacPro7,1', 'Mac Pro (2019)', 'Mac Pro')
+)
+
+MOBILE_MODELS = (
+    Model('iPhone9,1', 'iPhone 7', 'iPhone'),
+    Model('iPhone10,1', 'iPhone 8', 'iPhone'),
+    Model('iPhone10,3', 'iPhone X', 'iPhone'),
+    Model('iPhone11,2', 'iPhone XS', 'iPhone'),
+    Model('iPhone12,1', 'iPhone 11', 'iPhone'),
+    Model('iPad7,5', 'iPad (6th generation)', 'iPad'),
+    Model('iPad7,11', 'iPad (7th generation)', 'iPad'),
+    Model('iPad8,1', 'iPad Pro (11-inch)', 'iPad'),
+    Model('iPad11,3', 'iPad Air (3rd generation)', 'iPad')
+)
+
+COMPUTER_OPERATING_SYSTEMS = (
+    OperatingSystem('10.12.6', '16G29'),
+    OperatingSystem('10.13.6', '17G65'),
+    OperatingSystem('10.14.6', '18G84'),
+    OperatingSystem('10.15.4', '19E287'),
+    OperatingSystem('10.15.7', '19H2')
+)
+
+MOBILE_OPERATING_SYSTEMS = (
+    OperatingSystem('11.4.1', '15G77'),
+    OperatingSystem('12.4.1', '16G102'),
+    OperatingSystem('13.5.1', '17F80'),
+    OperatingSystem('13.7', '17H35')
+)
+
+MODELS = {
+    'computer': COMPUTER_MODELS,
+    'mobile': MOBILE_MODELS
+}
+
+OPERATING_SYSTEMS = {
+    'computer': COMPUTER_OPERATING_SYSTEMS,
+    'mobile': MOBILE_OPERATING_SYSTEMS
+}
+
+# Type Allocation Codes (the first eight digits of an IMEI) for iPhone models.
+IMEI_TACS = (
+    '35325108', '35391708', '35674108', '35917209', '35206811', '35332910'
+)
+
+# Issuer prefix for ICCIDs: telecom industry (89) and the US country code (01).
+ICCID_PREFIX = '8901'
+
+_LOCATIONS = []
+
+
+def _build_locations():
+    """Build the table of :class:`LocationData` objects with one entry for
+    every combination of first and last name.
+    """
+    from .models.data_sets import LocationData
+
+    index = 0
+    for last in LAST_NAMES:
+        for first in FIRST_NAMES:
+            username = intern('{}.{}'.format(first, last).lower())
+            _LOCATIONS.append(LocationData(
+                username=username,
+                realname=intern('{} {}'.format(first, last)),
+                email=intern('{}@{}'.format(username, EMAIL_DOMAIN)),
+                phone=intern('555-{:04d}'.format(index)),
+                position=POSITIONS[index % len(POSITIONS)],
+                department=DEPARTMENTS[index % len(DEPARTMENTS)],
+                building=BUILDINGS[index % len(BUILDINGS)],
+                room=intern(str(100 + index % 400))
+            ))
+            index += 1
+
+
+def location_table():
+    """Return the shared table of generated :class:`LocationData` objects.
+
+    The table is built the first time it is requested.
+
+    :rtype: list
+    """
+    if not _LOCATIONS:
+        _build_locations()
+
+    return _LOCATIONS
+
+
+def generate_location():
+    """Return a realistic :class:`LocationData` object.
+
+    :rtype: LocationData
+    """
+    return random.choice(location_table())
+
+
+def generate_model(mode, rng=None):
+    """Return a model for a device.
+
+    :param str mode: ``computer`` or ``mobile``
+    :param random.Random rng: An optional random number generator to use.
+
+    :rtype: Model
+    """
+    try:
+        return (rng or random).choice(MODELS[mode])
+    except KeyError:
+        raise InvalidMode("Must be 'computer' or 'mobile'")
+
+
+def find_model(mode, name=None, identifier=None):
+    """Return the model in the lookup tables with a matching name or
+    identifier.
+
+    :param str mode: ``computer`` or ``mobile``
+    :param str name: A model name, e.g. 'iPhone X'
+    :param str identifier: A model identifier, e.g. 'iPhone10,3'
+
+    :return: The model, or ``None`` if there is no match
+    :rtype: Model
+    """
+    try:
+        models = MODELS[mode]
+    except KeyError:
+        raise InvalidMode("Must be 'computer' or 'mobile'")
+
+    for model in models:
+        if model.name == name or model.identifier == identifier:
+            return model
+
+    return None
+
+
+def generate_operating_system(mode, rng=None):
+    """Return an OS version and build for a device.
+
+    :param str mode: ``computer`` or ``mobile``
+    :param random.Random rng: An optional random number generator to use.
+
+    :rtype: OperatingSystem
+    """
+    try:
+        return (rng or random).choice(OPERATING_SYSTEMS[mode])
+    except KeyError:
+        raise InvalidMode("Must be 'computer' or 'mobile'")
+
+
+def luhn_check_digit(digits):
+    """Return the Luhn check digit for a string of digits.
+
+    :param str digits: The digits without a check digit.
+
+    :rtype: str
+    """
+    total = 0
+    for position, digit in enumerate(reversed(digits)):
+        value = int(digit)
+        if position % 2 == 0:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+
+    return str((10 - total % 10) % 10)
+
+
+def generate_imei(tac=None, rng=None):
+    """Generate a 15 digit IMEI with a valid check digit.
+
+    :param str tac: An optional eight digit Type Allocation Code. If not
+        provided one is chosen from ``IMEI_TACS``.
+
+    :param random.Random rng: An optional random number generator to use.
+
+    :rtype: str
+    """
+    rng = rng or random
+    digits = '{}{:06d}'.format(
+        tac or rng.choice(IMEI_TACS), rng.randint(0, 999999))
+    return digits + luhn_check_digit(digits)
+
+
+def generate_iccid(rng=None):
+    """Generate a 20 digit ICCID with a valid check digit.
+
+    :param random.Random rng: An optional random number generator to use.
+
+    :rtype: str
+    """
+    digits = '{}{:015d}'.format(
+        ICCID_PREFIX, (rng or random).randint(0, 999999999999999))
+    return digits + luhn_check_digit(digits)
@@ -0,0 +1,464 @@
+"""
+This module contains an HTTP/2 sender that multiplexes many webhook requests
+over a small number of connections to each receiver.
+
+It requires the optional ``h2`` package (``pip install jook[http2]``).
+``http://`` URLs are sent as cleartext HTTP/2 with prior knowledge (h2c) and
+``https://`` URLs negotiate HTTP/2 with ALPN.
+"""
+import socket
+import ssl
+import threading
+from collections import namedtuple
+from urlparse import urlparse
+
+from .exceptions import JookException, MissingDependency, ReceiverError
+
+
+class HTTP2Response(namedtuple('HTTP2Response',
+                               ('status_code', 'headers', 'content'))):
+    """The response to a request sent by :class:`HTTP2Sender`."""
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        """Return ``True`` if the status code is below 400."""
+        return self.status_code < 400
+
+
+class _Stream(object):
+    """The state of one request on an HTTP/2 connection.
+
+    ``done`` is set by the connection's reader once the response has ended
+    or the stream has failed.
+    """
+    __slots__ = (
+        'body', 'offset', 'sent', 'status', 'headers', 'chunks', 'response',
+        'error', 'done'
+    )
+
+    def __init__(self, body):
+        self.body = body
+        self.offset = 0
+        self.sent = False
+        self.status = None
+        self.headers = None
+        self.chunks = []
+        self.response = None
+        self.error = None
+        self.done = threading.Event()
+
+    def finish(self, response=None, error=None):
+        """Record the outcome of the stream and wake its waiter."""
+        self.response = response
+        self.error = error
+        self.done.set()
+
+
+class HTTP2Connection(object):
+    """A single HTTP/2 connection that sends requests as concurrent streams.
+
+    Any number of threads can send on the connection at once. ``lock`` is only
+    held while frames are written, and one reader thread hands each response
+    to the stream waiting for it.
+    """
+    def __init__(self, host, port, secure=False, timeout=None,
+                 max_streams=100):
+        """
+        :param str host:
+        :param int port:
+        :param bool secure: Use TLS and negotiate ``h2`` with ALPN.
+        :param float timeout: An optional timeout in seconds for connecting
+            and for each response.
+        :param int max_streams: The most streams open at once, if the
+            receiver allows that many.
+        """
+        from h2.config import H2Configuration
+        from h2.connection import H2Connection
+
+        sock = socket.create_connection((host, port), timeout=timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        if secure:
+            context = ssl.create_default_context()
+            context.set_alpn_protocols(['h2'])
+            sock = context.wrap_socket(sock, server_hostname=host)
+            if sock.selected_alpn_protocol() != 'h2':
+                sock.close()
+                raise JookException(
+                    'Receiver did not negotiate HTTP/2: {}'.format(host))
+
+        # The reader blocks until frames arrive, however long that takes.
+        sock.settimeout(None)
+
+        self.scheme = 'https' if secure else 'http'
+        self.authority = '{}:{}'.format(host, port)
+        self.timeout = timeout
+        self.max_streams = int(max_streams)
+        self.lock = threading.Lock()
+        self.closed = False
+
+        self._sock = sock
+        self._streams = {}
+        self._slots = threading.Condition(self.lock)
+        self._conn = H2Connection(config=H2Configuration(client_side=True))
+        self._conn.initiate_connection()
+        self._flush()
+
+        self._reader = threading.Thread(target=self._read)
+        self._reader.daemon = True
+        self._reader.start()
+
+    def _flush(self):
+        """Write any pending frames to the socket."""
+        data = self._conn.data_to_send()
+        if data:
+            self._sock.sendall(data)
+
+    def _start(self, prepared):
+        """Send the headers for a request and return its stream ID."""
+        parsed = urlparse(prepared.url)
+        path = parsed.path or '/'
+        if parsed.query:
+            path += '?' + parsed.query
+
+        stream_id = self._conn.get_next_available_stream_id()
+
+        headers = [
+            (':method', 'POST'),
+            (':scheme', self.scheme),
+            (':authority', self.authority),
+            (':path', path),
+            ('content-length', str(len(prepared.body)))
+        ]
+        headers.extend(
+            (name.lower(), value) for name, value in prepared.headers.items()
+        )
+
+        self._conn.send_headers(stream_id, headers)
+        return stream_id
+
+    def _send_bodies(self):
+        """Send as much of each request body as flow control allows."""
+        conn = self._conn
+
+        for stream_id, stream in self._streams.items():
+            body = stream.body
+
+            while not stream.sent:
+                size = min(
+                    conn.local_flow_control_window(stream_id),
+                    conn.max_outbound_frame_size,
+                    len(body) - stream.offset
+                )
+                end = stream.offset + size == len(body)
+
+                if size <= 0 and not end:
+                    break
+
+                conn.send_data(
+                    stream_id, body[stream.offset:stream.offset + size],
+                    end_stream=end)
+                stream.offset += size
+                stream.sent = end
+
+    def _end(self, stream_id, response=None, error=None):
+        """Stop tracking a stream, wake its waiter and free its slot."""
+        stream = self._streams.pop(stream_id, None)
+        if stream is not None:
+            stream.finish(response, error)
+            self._slots.notify_all()
+
+    def _handle(self, event):
+        """Apply one h2 event to the stream it belongs to."""
+        from h2 import events
+
+        # Frames can still arrive for streams that are no longer tracked.
+        stream = self._streams.get(getattr(event, 'stream_id', None))
+
+        if isinstance(event, events.ResponseReceived):
+            if stream is not None:
+                stream.headers = dict(event.headers)
+                stream.status = int(stream.headers[b':status'])
+
+        elif isinstance(event, events.DataReceived):
+            if stream is not None:
+                stream.chunks.append(event.data)
+            self._conn.acknowledge_received_data(
+                event.flow_controlled_length, event.stream_id)
+
+        elif isinstance(event, events.StreamEnded):
+            if stream is not None:
+                self._end(event.stream_id, response=HTTP2Response(
+                    stream.status, stream.headers, b''.join(stream.chunks)))
+
+        elif isinstance(event, events.StreamReset):
+            self._end(event.stream_id, error=JookException(
+                'Receiver reset stream {} (error code {})'.format(
+                    event.stream_id, event.error_code)))
+
+        elif isinstance(event, events.ConnectionTerminated):
+            raise JookException(
+                'Receiver terminated the HTTP/2 connection '
+                '(error code {})'.format(event.error_code))
+
+    def _read(self):
+        """Read frames until the connection closes, handing responses to the
+        streams waiting for them.
+        """
+        try:
+            while True:
+                data = self._sock.recv(65536)
+                if not data:
+                    raise JookException(
+                        'Receiver closed the HTTP/2 connection')
+
+                with self.lock:
+                    for event in self._conn.receive_data(data):
+                        self._handle(event)
+                    # Window updates may let more of a body be sent.
+                    self._send_bodies()
+                    self._flush()
+
+        except Exception as err:
+            with self.lock:
+                if not isinstance(err, JookException):
+                    err = JookException(
+                        'The HTTP/2 connection failed: {}'.format(err))
+                self._fail(err)
+
+    def _fail(self, error):
+        """Close the connection and fail every stream still open on it."""
+        self._close()
+        for stream_id in list(self._streams):
+            self._end(stream_id, error=error)
+
+    def _open(self, prepared):
+        """Wait for a free stream slot and start a request on it."""
+        with self.lock:
+            while True:
+                if self.closed:
+                    raise JookException('The HTTP/2 connection is closed')
+
+                limit = min(
+                    self.max_streams,
+                    self._conn.remote_settings.max_concurrent_streams
+                )
+                if len(self._streams) < limit:
+                    break
+                self._slots.wait()
+
+            try:
+                stream_id = self._start(prepared)
+                stream = self._streams[stream_id] = _Stream(prepared.body)
+                self._send_bodies()
+                self._flush()
+            except Exception as err:
+                error = JookException(
+                    'The HTTP/2 connection failed: {}'.format(err))
+                self._fail(error)
+                raise error
+
+            return stream_id, stream
+
+    def _wait(self, stream_id, stream):
+        """Wait for a stream's response, resetting it after ``timeout``."""
+        if not stream.done.wait(self.timeout):
+            with self.lock:
+                if stream_id in self._streams:
+                    try:
+                        self._conn.reset_stream(stream_id)
+                        self._flush()
+                    except Exception:
+                        pass
+                    self._end(stream_id, error=JookException(
+                        'Timed out waiting for stream {}'.format(stream_id)))
+
+        if stream.error is not None:
+            raise stream.error
+        return stream.response
+
+    def send_batch(self, prepared_requests):
+        """Send a list of prepared webhooks as concurrent streams, keeping no
+        more streams open than the receiver allows.
+
+        Other threads can send on the connection at the same time; their
+        streams are multiplexed with these.
+
+        :param list prepared_requests:
+
+        :return: The responses in the same order
+        :rtype: list
+
+        :raises JookException: The connection is closed or failed, a stream
+            was reset, or a response timed out. A failed connection is closed
+            and cannot be used again.
+        """
+        streams = [self._open(prepared) for prepared in prepared_requests]
+        return [self._wait(stream_id, stream) for stream_id, stream in streams]
+
+    def close(self):
+        """Close the connection and wait for its reader to stop."""
+        with self.lock:
+            self._fail(JookException('The HTTP/2 connection is closed'))
+
+        if threading.current_thread() is not self._reader:
+            self._reader.join()
+
+    def _close(self):
+        """Send GOAWAY if possible and close the socket."""
+        if self.closed:
+            return
+
+        self.closed = True
+        try:
+            self._conn.close_connection()
+            self._flush()
+        except Exception:
+            pass
+        try:
+            # Wakes the reader, which is blocked in recv().
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self._sock.close()
+
+
+class HTTP2Sender(object):
+    """Sends prepared webhooks over HTTP/2, multiplexing them over
+    ``connections`` connections per receiver.
+
+    It has the same interface as :class:`Sender <jook.senders.Sender>` and can
+    be passed to a :class:`Jook <jook.models.webhooks.Jook>` group.
+    """
+    def __init__(self, connections=1, timeout=None, max_streams=100):
+        """
+        :param int connections: The number of connections opened to each
+            receiver. Batches are split evenly across them.
+
+        :param float timeout: An optional timeout in seconds for connecting
+            and for each response.
+
+        :param int max_streams: The most streams open at once on each
+            connection, if the receiver allows that many.
+
+        :raises MissingDependency: The ``h2`` package is not installed.
+        """
+        try:
+            import h2
+        except ImportError:
+            raise MissingDependency(
+                "HTTP/2 requires the 'h2' package: pip install jook[http2]")
+
+        self.connections = int(connections)
+        self.timeout = timeout
+        self.max_streams = int(max_streams)
+
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _receiver(url):
+        """Return the ``(hostname, port, secure)`` key of a URL's receiver."""
+        parsed = urlparse(url)
+        secure = parsed.scheme == 'https'
+        return parsed.hostname, parsed.port or (443 if secure else 80), secure
+
+    def _pool(self, receiver):
+        """Return the connections for a receiver, opening them the first
+        time and replacing any that were closed after failing.
+        """
+        hostname, port, secure = receiver
+
+        with self._lock:
+            pool = self._pools.setdefault(receiver, [None] * self.connections)
+            for index, connection in enumerate(pool):
+                if connection is None or connection.closed:
+                    pool[index] = HTTP2Connection(
+                        hostname, port, secure, self.timeout,
+                        self.max_streams)
+            return list(pool)
+
+    def send(self, prepared):
+        """Send a prepared webhook.
+
+        :param PreparedWebhook prepared:
+
+        :rtype: HTTP2Response
+
+        :raises ReceiverError: The receiver returned an error status.
+        """
+        return self.send_batch([prepared])[0]
+
+    def send_batch(self, prepared_requests):
+        """Send a list of prepared webhooks concurrently.
+
+        The requests are grouped by receiver and each group is split evenly
+        across that receiver's connections.
+
+        :param list prepared_requests:
+
+        :return: The responses in the same order
+        :rtype: list
+
+        :raises ReceiverError: A receiver returned an error status.
+        """
+        prepared_requests = list(prepared_requests)
+
+        receivers = {}
+        for index, prepared in enumerate(prepared_requests):
+            receivers.setdefault(
+                self._receiver(prepared.url), []).append(index)
+
+        # One job for each connection with the indexes of its requests.
+        jobs = []
+        for receiver, indexes in receivers.items():
+            pool = self._pool(receiver)
+            for number, connection in enumerate(pool):
+                share = indexes[number::len(pool)]
+                if share:
+                    jobs.append((connection, share))
+
+        responses = [None] * len(prepared_requests)
+        errors = []
+
+        def run(connection, share):
+            try:
+                results = connection.send_batch(
+                    [prepared_requests[index] for index in share])
+            except Exception as err:
+                errors.append(err)
+            else:
+                for index, response in zip(share, results):
+                    responses[index] = response
+
+        if len(jobs) == 1:
+            # A single send() needs no thread of its own.
+            run(*jobs[0])
+        else:
+            threads = [
+                threading.Thread(target=run, args=job) for job in jobs
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        if errors:
+            raise errors[0]
+
+        for response in responses:
+            if not response.ok:
+                raise ReceiverError(
+                    'Receiver returned status {}'.format(response.status_code))
+
+        return responses
+
+    def close(self):
+        """Close all connections."""
+        with self._lock:
+            for pool in self._pools.values():
+                for connection in pool:
+                    if connection is not None:
+                        connection.close()
+            self._pools = {}
@@ -3,7 +3,6 @@ This module contains functions for generating unique identifiers for objects.
 """
 
 import random
-import uuid
 
 from .exceptions import InvalidMode
 
@@ -59,19 +58,23 @@ SERIAL_CHAR_SETS = {
 }
 
 
-def generate_mac_address():
-    """Generate a mock MAC address for a device."""
+def generate_mac_address(rng=None):
+    """Generate a mock MAC address for a device.
+
+    :param random.Random rng: An optional random number generator to use.
+    """
+    rng = rng or random
     return "{:02x}:{:02x}:{:02x}:{:02x}:{:02x}:{:02x}".format(
-        random.randint(0, 255),
-        random.randint(0, 255),
-        random.randint(0, 255),
-        random.randint(0, 255),
-        random.randint(0, 255),
-        random.randint(0, 255)
+        rng.randint(0, 255),
+        rng.randint(0, 255),
+        rng.randint(0, 255),
+        rng.randint(0, 255),
+        rng.randint(0, 255),
+        rng.randint(0, 255)
     )
 
 
-def generate_serial(mode):
+def generate_serial(mode, rng=None):
     """Generate a mock serial number for a device.
 
     :param str mode:
@@ -81,6 +84,8 @@ def generate_serial(mode):
            * computer
            * mobile
 
+    :param random.Random rng: An optional random number generator to use.
+
     :return: Serial number
     :rtype: str
     """
@@ -89,9 +94,19 @@ def generate_serial(mode):
     except KeyError as err:
         raise InvalidMode(err.message)
 
-    return ''.join([random.choice(char_set[i]) for i in range(12)])
+    rng = rng or random
+    return ''.join([rng.choice(char_set[i]) for i in range(12)])
+
+
+def generate_uuid(rng=None):
+    """Return a UUID value as a string
+
+    :param random.Random rng: An optional random number generator to use.
+        If not provided the UUID comes from ``uuid.uuid4()``.
+    """
+    import uuid
 
+    if rng is None:
+        return str(uuid.uuid4()).upper()
 
-def generate_uuid():
-    """Return a UUID value as a string"""
-    return str(uuid.uuid4()).upper()
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4)).upper()
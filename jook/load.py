@@ -0,0 +1,162 @@
+"""
+This module contains the adaptive load mode for finding the highest throughput
+a receiver can sustain before its latency degrades.
+"""
+import threading
+import timeit
+from collections import namedtuple
+
+from .stats import LatencyStats
+
+LoadStep = namedtuple('LoadStep', (
+    'concurrency', 'requests', 'errors', 'throughput', 'p50', 'p95', 'p99',
+    'degraded'
+))
+
+AdaptiveResult = namedtuple('AdaptiveResult', ('knee', 'steps'))
+
+
+class AdaptiveLoad(object):
+    """Fires a webhook at increasing concurrency until the receiver's latency
+    or error rate degrades, using additive-increase/multiplicative-decrease
+    (AIMD) to settle around the knee point.
+
+    Each step runs ``concurrency`` workers in a closed loop for
+    ``step_duration`` seconds. A step is degraded if its error rate is above
+    ``error_threshold`` or its 95th percentile latency is above the latency
+    limit. Healthy steps add ``increase`` workers and degraded steps multiply
+    the workers by ``decrease``.
+    """
+    def __init__(self, target, start_concurrency=1, max_concurrency=256,
+                 increase=1, decrease=0.5, step_duration=5.0,
+                 latency_limit=None, latency_factor=2.0, error_threshold=0.01,
+                 max_steps=50, settle=3):
+        """
+        :param target: A webhook object, or any callable that sends one
+            request and raises an exception if it fails (e.g. a bound
+            :func:`Sender.send() <jook.senders.Sender.send>` wrapped with a
+            prepared request).
+
+        :param int start_concurrency: The number of workers for the first
+            step.
+
+        :param int max_concurrency: The most workers that will be used.
+
+        :param int increase: Workers added after a healthy step.
+
+        :param float decrease: The multiplier applied to the workers after a
+            degraded step.
+
+        :param float step_duration: Seconds to run each step for.
+
+        :param float latency_limit: The 95th percentile latency in seconds
+            above which a step is degraded. If not provided the limit is the
+            first step's 95th percentile multiplied by ``latency_factor``.
+
+        :param float latency_factor: See ``latency_limit``.
+
+        :param float error_threshold: The error rate above which a step is
+            degraded.
+
+        :param int max_steps: The most steps that will be run.
+
+        :param int settle: The run ends after this many degraded steps, as
+            AIMD will keep oscillating around the knee from then on.
+        """
+        self._fire = target.fire if hasattr(target, 'fire') else target
+
+        self.start_concurrency = int(start_concurrency)
+        self.max_concurrency = int(max_concurrency)
+        self.increase = int(increase)
+        self.decrease = float(decrease)
+        self.step_duration = float(step_duration)
+        self.latency_limit = latency_limit
+        self.latency_factor = float(latency_factor)
+        self.error_threshold = float(error_threshold)
+        self.max_steps = int(max_steps)
+        self.settle = int(settle)
+
+    def _worker(self, stats, deadline):
+        """Fire requests until the deadline, recording each one."""
+        fire = self._fire
+        clock = timeit.default_timer
+
+        while clock() < deadline:
+            start = clock()
+            try:
+                fire()
+            except Exception:
+                stats.record(clock() - start, error=True)
+            else:
+                stats.record(clock() - start)
+
+    def run_step(self, concurrency):
+        """Run one step at a fixed concurrency.
+
+        :param int concurrency: The number of workers.
+
+        :return: The step's stats and its duration in seconds
+        :rtype: tuple
+        """
+        stats = LatencyStats()
+        start = timeit.default_timer()
+        deadline = start + self.step_duration
+
+        workers = [
+            threading.Thread(target=self._worker, args=(stats, deadline))
+            for _ in range(concurrency)
+        ]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        return stats, timeit.default_timer() - start
+
+    def run(self):
+        """Run steps until the knee is found or ``max_steps`` is reached.
+
+        :return: The healthy step with the highest throughput (``None`` if
+            every step was degraded) and every step in the order they ran.
+        :rtype: AdaptiveResult
+        """
+        concurrency = self.start_concurrency
+        latency_limit = self.latency_limit
+        steps = []
+        backoffs = 0
+
+        while len(steps) < self.max_steps and backoffs < self.settle:
+            stats, elapsed = self.run_step(concurrency)
+            p95 = stats.percentile(95)
+
+            if latency_limit is None:
+                latency_limit = p95 * self.latency_factor
+
+            degraded = (
+                stats.error_rate > self.error_threshold or p95 > latency_limit
+            )
+
+            steps.append(LoadStep(
+                concurrency=concurrency,
+                requests=stats.count,
+                errors=stats.errors,
+                throughput=stats.count / elapsed,
+                p50=stats.percentile(50),
+                p95=p95,
+                p99=stats.percentile(99),
+                degraded=degraded
+            ))
+
+            if degraded:
+                backoffs += 1
+                concurrency = max(1, int(concurrency * self.decrease))
+            else:
+                concurrency = min(
+                    self.max_concurrency, concurrency + self.increase)
+
+        healthy = [step for step in steps if not step.degraded]
+        knee = max(healthy, key=lambda step: step.throughput) \
+            if healthy else None
+
+        return AdaptiveResult(knee=knee, steps=steps)
@@ -1,6 +1,7 @@
 """Classes and objects to hold sets of data for webhook events."""
 from collections import namedtuple
 
+from .. import generators
 from ..exceptions import InvalidDeviceType
 from ..identifiers import generate_mac_address, generate_serial, generate_uuid
 
@@ -11,7 +12,9 @@ class DeviceData(object):
     """
     def __init__(self, device_type='computer', mac_address=None,
                  mac_address_alt=None, serial_number=None, uuid=None,
-                 randomize=False):
+                 randomize=False, device_name=None, model=None,
+                 model_identifier=None, os_version=None, os_build=None,
+                 imei=None, iccid=None, realistic=False, rng=None):
         """Instantiate a DeviceData object.
 
         Pass values for the different attributes to manually customize the data.
@@ -30,6 +33,27 @@ class DeviceData(object):
         :param bool randomize: If ``True``, no initial values will be set
             (passed args will be ignored) and a random value will be generated
             each time an attribute is called.
+
+        :param str device_name:
+        :param str model:
+        :param str model_identifier:
+        :param str os_version:
+        :param str os_build:
+        :param str imei:
+        :param str iccid:
+
+        :param bool realistic: If ``True``, descriptive attributes that were
+            not passed are drawn from the lookup tables in
+            :mod:`jook.generators`. Otherwise they default to empty strings.
+            These attributes are not affected by ``randomize``.
+
+            If ``model`` or ``model_identifier`` is passed, the other is
+            looked up in :data:`MODELS <jook.generators.MODELS>`, and the
+            device name, IMEI and ICCID follow the model's family.
+
+        :param random.Random rng: An optional random number generator for the
+            initial values, so that a generator with the same seed creates
+            the same device.
         """
         if device_type in ('computer', 'mobile'):
             self.mode = device_type
@@ -37,16 +61,52 @@ class DeviceData(object):
             raise InvalidDeviceType("Must be 'computer' or 'mobile'")
 
         if not randomize:
-            self.set_mac_address()
-            self.set_mac_address_alt()
-            self.set_serial_number()
-            self.set_uuid()
+            self.set_mac_address(generate_mac_address(rng))
+            self.set_mac_address_alt(generate_mac_address(rng))
+            self.set_serial_number(generate_serial(self.mode, rng))
+            self.set_uuid(generate_uuid(rng))
         else:
             self._mac_address = mac_address
             self._mac_address_alt = mac_address_alt
             self._serial_number = serial_number
             self._uuid = uuid
 
+        if realistic:
+            if model or model_identifier:
+                # Derive the other model attributes from the one that was
+                # passed so they describe the same device.
+                device_model = generators.find_model(
+                    self.mode, model, model_identifier) or \
+                    generators.Model(
+                        model_identifier or '', model or model_identifier,
+                        model or model_identifier)
+            else:
+                device_model = generators.generate_model(self.mode, rng)
+
+            operating_system = generators.generate_operating_system(
+                self.mode, rng)
+
+            model = model or device_model.name
+            model_identifier = model_identifier or device_model.identifier
+            os_version = os_version or operating_system.version
+            os_build = os_build or operating_system.build
+
+            if not device_name:
+                device_name = '{} {}'.format(
+                    device_model.family, self.serial_number[-4:])
+
+            if device_model.family.startswith('iPhone'):
+                imei = imei or generators.generate_imei(rng=rng)
+                iccid = iccid or generators.generate_iccid(rng)
+
+        self.device_name = device_name or ''
+        self.model = model or ''
+        self.model_identifier = model_identifier or ''
+        self.os_version = os_version or ''
+        self.os_build = os_build or ''
+        self.imei = imei or ''
+        self.iccid = iccid or ''
+
     @property
     def mac_address(self):
         """Return the value for ``mac_address``."""
@@ -0,0 +1,206 @@
+"""Classes for selecting devices from a fleet with a controlled distribution."""
+import random
+import time
+from array import array
+from bisect import bisect_left
+
+from .data_sets import DeviceData, LocationData
+from ..exceptions import InvalidDeviceType, InvalidMode, JookException
+from ..generators import location_table
+
+_EMPTY_LOCATION = LocationData()
+
+
+class Fleet(object):
+    """A fleet of devices that device webhooks pick from each time their
+    ``data`` is built.
+
+    Devices are identified by an index from ``0`` to ``size - 1``. The
+    :class:`DeviceData` object for an index is created the first time that
+    index is picked and reused after that, so identifiers stay stable for the
+    life of the fleet.
+    """
+    def __init__(self, size, device_type='computer', distribution='uniform',
+                 skew=1.0, growth=0.0, max_size=None, realistic=False,
+                 seed=None, clock=time.time, store=None, offset=0,
+                 device_seed=None):
+        """
+        :param int size: The number of devices in the fleet at the start.
+
+        :param str device_type: ``computer`` or ``mobile``.
+
+        :param str distribution: How often each device is picked. Can only be
+            'uniform' or 'zipf'.
+
+            With 'zipf' the device at index ``k`` is picked with a weight of
+            ``1 / (k + 1) ** skew``, so low indexes are the busiest devices.
+            The weights use the index in the whole fleet, so a fleet with an
+            ``offset`` picks from its slice of the same curve.
+
+        :param float skew: The Zipf exponent (ignored for 'uniform').
+
+        :param float growth: The fraction of the starting ``size`` added to
+            the fleet every hour (e.g. ``0.05`` for 5% new devices per hour).
+            New devices are given the next free indexes.
+
+        :param int max_size: An optional cap on the fleet size when
+            ``growth`` is set.
+
+        :param bool realistic: Passed to each :class:`DeviceData` object, and
+            if ``True`` each device is assigned an entry from the
+            :func:`location_table() <jook.generators.location_table>`.
+
+        :param seed: An optional seed for the picks made by the fleet.
+
+        :param clock: A function returning the current time in seconds, used
+            to calculate ``growth``.
+
+        :param store: An optional object holding the fleet's devices, such as
+            a :class:`SharedFleet <jook.models.shared.SharedFleet>`. The
+            ``device()`` and ``location()`` methods of the store are used
+            instead of creating devices, and the fleet size is capped at the
+            store's ``size``.
+
+        :param int offset: The index of the fleet's first device, for a fleet
+            that is one partition of a larger fleet. Picked indexes run from
+            ``offset`` to ``offset + size - 1``.
+
+        :param int device_seed: An optional seed for the devices' generated
+            values. Each device is generated from this seed and its index, so
+            fleets with the same ``device_seed`` (e.g. in different
+            processes) have the same device at each index.
+
+        :raises InvalidDeviceType:
+        :raises InvalidMode:
+        :raises JookException: ``size`` is less than 1, or ``store`` has no
+            devices from ``offset``.
+        """
+        if int(size) < 1:
+            raise JookException('A fleet must have at least one device')
+
+        if device_type not in ('computer', 'mobile'):
+            raise InvalidDeviceType("Must be 'computer' or 'mobile'")
+
+        if distribution not in ('uniform', 'zipf'):
+            raise InvalidMode("Must be 'uniform' or 'zipf'")
+
+        self.device_type = device_type
+        self.distribution = distribution
+        self.initial_size = int(size)
+        self.skew = float(skew)
+        self.growth = float(growth)
+        self.max_size = int(max_size) if max_size else None
+        self.realistic = realistic
+        self.store = store
+        self.offset = int(offset)
+        self.device_seed = device_seed
+
+        if store is not None:
+            available = store.size - self.offset
+            if available < 1:
+                raise JookException('The store has no devices from the offset')
+            self.max_size = min(self.max_size or available, available)
+
+        self._random = random.Random(seed)
+        self._clock = clock
+        self._started = clock()
+        self._devices = {}
+        self._weights = array('d')
+
+    @property
+    def size(self):
+        """Return the current number of devices in the fleet."""
+        size = self.initial_size
+
+        if self.growth:
+            hours = (self._clock() - self._started) / 3600.0
+            size += int(self.initial_size * self.growth * hours)
+
+        return min(size, self.max_size) if self.max_size else size
+
+    def _extend_weights(self, size):
+        """Extend the cumulative Zipf weights to cover ``size`` devices."""
+        weights = self._weights
+        total = weights[-1] if weights else 0.0
+        skew = self.skew
+        first = self.offset + 1
+
+        for rank in range(first + len(weights), first + size):
+            total += 1.0 / rank ** skew
+            weights.append(total)
+
+    def pick(self):
+        """Return the index of a device chosen according to the fleet's
+        distribution.
+
+        :rtype: int
+        """
+        size = self.size
+
+        if self.distribution == 'uniform':
+            return self.offset + self._random.randrange(size)
+
+        if len(self._weights) < size:
+            self._extend_weights(size)
+
+        target = self._random.random() * self._weights[size - 1]
+        return self.offset + bisect_left(self._weights, target, 0, size - 1)
+
+    def sample(self, count):
+        """Return ``count`` distinct device indexes chosen uniformly from the
+        fleet.
+
+        :param int count:
+
+        :rtype: list
+        """
+        return self._random.sample(
+            xrange(self.offset, self.offset + self.size), count)
+
+    def device(self, index):
+        """Return the :class:`DeviceData` object for a fleet index.
+
+        :param int index:
+
+        :rtype: DeviceData
+        """
+        if self.store is not None:
+            return self.store.device(index)
+
+        try:
+            return self._devices[index]
+        except KeyError:
+            rng = None
+            if self.device_seed is not None:
+                rng = random.Random((int(self.device_seed) << 32) + index)
+
+            device = DeviceData(
+                device_type=self.device_type, realistic=self.realistic,
+                rng=rng)
+            self._devices[index] = device
+            return device
+
+    def location(self, index):
+        """Return the :class:`LocationData` object for a fleet index.
+
+        :param int index:
+
+        :rtype: LocationData
+        """
+        if self.store is not None:
+            return self.store.location(index)
+
+        if not self.realistic:
+            return _EMPTY_LOCATION
+
+        table = location_table()
+        return table[index % len(table)]
+
+    def member(self):
+        """Pick a device and return its device and location data.
+
+        :return: A tuple of ``(DeviceData, LocationData)``
+        :rtype: tuple
+        """
+        index = self.pick()
+        return self.device(index), self.location(index)
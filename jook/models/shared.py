@@ -0,0 +1,250 @@
+"""A fleet store held in a memory-mapped file that can be shared by processes.
+
+Device identifiers, device attributes and location fields are stored in
+fixed-width columns. Worker processes read values straight from the shared
+mapping instead of each holding their own ``DeviceData`` and ``LocationData``
+objects, and a change made by one process (e.g. calling
+``set_serial_number()``) is seen by all of them.
+"""
+import mmap
+import struct
+
+from .data_sets import DeviceData, LocationData
+from ..exceptions import InvalidDeviceType, JookException
+from ..generators import generate_location
+
+# Magic bytes, device type and number of devices.
+HEADER = struct.Struct('<8s8sQ')
+HEADER_SIZE = 64
+MAGIC = b'JOOKFLT1'
+
+DEVICE_COLUMNS = (
+    ('mac_address', 17),
+    ('mac_address_alt', 17),
+    ('serial_number', 12),
+    ('uuid', 36),
+    ('device_name', 64),
+    ('model', 64),
+    ('model_identifier', 32),
+    ('os_version', 16),
+    ('os_build', 16),
+    ('imei', 15),
+    ('iccid', 20)
+)
+
+LOCATION_COLUMNS = (
+    ('username', 64),
+    ('realname', 64),
+    ('email', 128),
+    ('phone', 32),
+    ('position', 64),
+    ('department', 64),
+    ('building', 64),
+    ('room', 32)
+)
+
+COLUMNS = DEVICE_COLUMNS + LOCATION_COLUMNS
+
+ROW_SIZE = sum(width for _, width in COLUMNS)
+
+
+class _Column(object):
+    """Descriptor that reads and writes one column of a :class:`SharedFleet`
+    for a :class:`SharedDeviceData` object.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            return self
+        return obj.store.read(self.name, obj.index)
+
+    def __set__(self, obj, value):
+        obj.store.write(self.name, obj.index, value or '')
+
+
+class SharedDeviceData(DeviceData):
+    """A :class:`DeviceData` object whose values are read from and written to
+    a :class:`SharedFleet`.
+
+    The object only holds the store and an index, so it is cheap to create
+    for every event.
+    """
+    _mac_address = _Column('mac_address')
+    _mac_address_alt = _Column('mac_address_alt')
+    _serial_number = _Column('serial_number')
+    _uuid = _Column('uuid')
+    device_name = _Column('device_name')
+    model = _Column('model')
+    model_identifier = _Column('model_identifier')
+    os_version = _Column('os_version')
+    os_build = _Column('os_build')
+    imei = _Column('imei')
+    iccid = _Column('iccid')
+
+    def __init__(self, store, index):
+        """
+        :param SharedFleet store:
+        :param int index: The device's index in the store.
+        """
+        self.store = store
+        self.index = index
+        self.mode = store.device_type
+
+
+class SharedFleet(object):
+    """Device and location data for a fleet in a memory-mapped file.
+
+    Create the file once with :func:`create()
+    <jook.models.shared.SharedFleet.create>` before starting workers. Forked
+    workers can use the parent's object directly; other processes open the
+    same path.
+    """
+    def __init__(self, path):
+        """Open an existing fleet file.
+
+        :param str path:
+
+        :raises JookException: The file is not a fleet file.
+        """
+        self.path = path
+
+        with open(path, 'r+b') as fobj:
+            self._map = mmap.mmap(fobj.fileno(), 0)
+
+        magic, device_type, size = HEADER.unpack_from(self._map, 0)
+
+        if magic != MAGIC:
+            raise JookException('Not a Jook fleet file: {}'.format(path))
+
+        self.device_type = device_type.rstrip(b'\0').decode('ascii')
+        self.size = size
+
+        self._columns = {}
+        offset = HEADER_SIZE
+        for name, width in COLUMNS:
+            self._columns[name] = (offset, width)
+            offset += width * size
+
+    @classmethod
+    def create(cls, path, size, device_type='computer', realistic=False):
+        """Create a fleet file and fill it with generated devices.
+
+        :param str path: The file to create (an existing file is replaced).
+
+        :param int size: The number of devices.
+
+        :param str device_type: ``computer`` or ``mobile``.
+
+        :param bool realistic: If ``True`` device attributes and locations are
+            filled in from :mod:`jook.generators`.
+
+        :rtype: SharedFleet
+
+        :raises InvalidDeviceType:
+        """
+        if device_type not in ('computer', 'mobile'):
+            raise InvalidDeviceType("Must be 'computer' or 'mobile'")
+
+        with open(path, 'wb') as fobj:
+            fobj.write(HEADER.pack(MAGIC, device_type.encode('ascii'), size))
+            fobj.truncate(HEADER_SIZE + ROW_SIZE * size)
+
+        fleet = cls(path)
+
+        for index in range(size):
+            device = DeviceData(device_type=device_type, realistic=realistic)
+            for name, _ in DEVICE_COLUMNS:
+                fleet.write(name, index, getattr(device, name) or '')
+
+            if realistic:
+                fleet.set_location(index, generate_location())
+
+        return fleet
+
+    def _check_index(self, index):
+        """Raise ``IndexError`` unless a device index is in the fleet.
+
+        Columns are stored back to back, so an index out of range would
+        read or write another column's values.
+        """
+        if not 0 <= index < self.size:
+            raise IndexError('Device index out of range: {}'.format(index))
+
+    def read(self, column, index):
+        """Return the value of a column for a device.
+
+        :param str column: The column name (see ``COLUMNS``).
+        :param int index:
+
+        :rtype: str
+
+        :raises IndexError: The index is not in the fleet.
+        """
+        self._check_index(index)
+        offset, width = self._columns[column]
+        start = offset + index * width
+        return self._map[start:start + width].rstrip(b'\0').decode('utf-8')
+
+    def write(self, column, index, value):
+        """Set the value of a column for a device.
+
+        :param str column: The column name (see ``COLUMNS``).
+        :param int index:
+        :param str value:
+
+        :raises IndexError: The index is not in the fleet.
+        :raises ValueError: The encoded value is wider than the column.
+        """
+        self._check_index(index)
+        offset, width = self._columns[column]
+
+        if not isinstance(value, bytes):
+            value = value.encode('utf-8')
+
+        if len(value) > width:
+            raise ValueError('{!r} is wider than the {} column ({})'.format(
+                value, column, width))
+
+        start = offset + index * width
+        self._map[start:start + width] = value.ljust(width, b'\0')
+
+    def device(self, index):
+        """Return a :class:`SharedDeviceData` view of a device.
+
+        :param int index:
+
+        :rtype: SharedDeviceData
+
+        :raises IndexError: The index is not in the fleet.
+        """
+        self._check_index(index)
+        return SharedDeviceData(self, index)
+
+    def location(self, index):
+        """Return the :class:`LocationData` for a device.
+
+        :param int index:
+
+        :rtype: LocationData
+        """
+        return LocationData(
+            *[self.read(name, index) for name, _ in LOCATION_COLUMNS])
+
+    def set_location(self, index, location):
+        """Store the :class:`LocationData` for a device.
+
+        :param int index:
+        :param LocationData location:
+        """
+        for name, _ in LOCATION_COLUMNS:
+            self.write(name, index, getattr(location, name))
+
+    def flush(self):
+        """Write changes to the file on disk."""
+        self._map.flush()
+
+    def close(self):
+        """Close the memory map."""
+        self._map.close()
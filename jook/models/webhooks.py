@@ -1,26 +1,147 @@
 """
 This module contains the main classes that will be interacted with directly.
 """
-import datetime
-import json
 import time
-from urlparse import urlparse
-
-from dicttoxml import dicttoxml
-import requests
+from collections import Mapping, namedtuple
 
+# Third-party and slower standard library modules (requests, dicttoxml, json,
+# datetime, urlparse) are imported where they are used so that ``import jook``
+# stays cheap for short-lived worker processes.
 from .data_sets import DeviceData, LocationData
-from ..exceptions import InvalidEvent, InvalidMode, InvalidURL
+from ..generators import generate_location
+from ..exceptions import InvalidEvent, InvalidMode, InvalidURL, JookException
+
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'xml': 'text/xml'
+}
+
+PreparedWebhook = namedtuple(
+    'PreparedWebhook', ('url', 'headers', 'body', 'event'))
+# ``event`` names the webhook event the request was prepared from. It is
+# optional so that requests can still be built by hand.
+PreparedWebhook.__new__.__defaults__ = (None,)
+
+
+class Headers(Mapping):
+    """A read-only mapping of request headers.
+
+    Prepared requests with the same data mode and ``Content-Encoding`` share
+    one :class:`Headers` object, so it cannot be changed. Use ``dict()`` to
+    get a copy that can be.
+    """
+    __slots__ = ('_headers',)
+
+    def __init__(self, *args, **kwargs):
+        self._headers = dict(*args, **kwargs)
+
+    def __getitem__(self, name):
+        return self._headers[name]
+
+    def __iter__(self):
+        return iter(self._headers)
+
+    def __len__(self):
+        return len(self._headers)
+
+    def __repr__(self):
+        return 'Headers({!r})'.format(self._headers)
+
+
+_HEADERS = {}
+
+
+def _headers(mode, encoding=None):
+    """Return the shared :class:`Headers` for a data mode and optional
+    ``Content-Encoding``.
+    """
+    try:
+        return _HEADERS[(mode, encoding)]
+    except KeyError:
+        headers = {'Content-Type': CONTENT_TYPES[mode]}
+        if encoding:
+            headers['Content-Encoding'] = encoding
+
+        headers = _HEADERS[(mode, encoding)] = Headers(headers)
+        return headers
 
 
 class Jook(object):
     """The Jook class is an object for managing and creating large numbers of
     webhook objects and firing them as a group.
-
-    NOT IMPLEMENTED
     """
-    def __init__(self):
-        pass
+    def __init__(self, webhooks=None, sender=None):
+        """
+        :param list webhooks: An optional list of webhook objects.
+
+        :param sender: The sender used by :func:`fire()
+            <jook.models.webhooks.Jook.fire>`. Defaults to a
+            :class:`Sender <jook.senders.Sender>`.
+        """
+        self.webhooks = list(webhooks or [])
+        self.sender = sender
+
+    def add(self, webhook):
+        """Add a webhook object to the group.
+
+        :param BaseWebhook webhook:
+        """
+        self.webhooks.append(webhook)
+
+    def prepare(self):
+        """Prepare a request for every webhook object in the group.
+
+        The bodies of webhooks that share a :class:`Compressor
+        <jook.compression.Compressor>` are compressed together with
+        :func:`compress_many() <jook.compression.Compressor.compress_many>`,
+        so a compressor with ``workers`` compresses them in parallel.
+
+        :return: A list of :class:`PreparedWebhook` objects
+        :rtype: list
+        """
+        bodies = [webhook.render() for webhook in self.webhooks]
+        encodings = [None] * len(bodies)
+
+        batches = {}
+        for index, webhook in enumerate(self.webhooks):
+            if webhook.compressor:
+                batches.setdefault(
+                    id(webhook.compressor), (webhook.compressor, [])
+                )[1].append(index)
+
+        for compressor, indexes in batches.values():
+            results = compressor.compress_many([bodies[i] for i in indexes])
+            for index, (body, encoding) in zip(indexes, results):
+                bodies[index] = body
+                encodings[index] = encoding
+
+        return [
+            PreparedWebhook(
+                webhook.url, _headers(webhook.mode, encoding), body,
+                webhook.event)
+            for webhook, body, encoding in zip(
+                self.webhooks, bodies, encodings)
+        ]
+
+    def fire(self, prepared=None):
+        """Send a request for every webhook object in the group as one batch.
+
+        :param list prepared: An optional list of :class:`PreparedWebhook`
+            objects to send instead of preparing new requests. The same list
+            can be sent any number of times.
+
+        :return: The responses from the sender
+        :rtype: list
+        """
+        if self.sender is None:
+            from ..senders import Sender
+            self.sender = Sender()
+
+        if prepared is None:
+            prepared = self.prepare()
+
+        return self.sender.send_batch(prepared)
 
 
 class BaseWebhook(object):
@@ -31,7 +152,8 @@ class BaseWebhook(object):
     valid_events = ('',)
 
     def __init__(self, url, event, webhook_id=1, webhook_name='Webhook',
-                 mode='json', randomize=False, timer=0, *args, **kwargs):
+                 mode='json', randomize=False, timer=0, compressor=None,
+                 shape=None, *args, **kwargs):
         """
         :param str url: The target URL (must contain the scheme)
 
@@ -62,11 +184,22 @@ class BaseWebhook(object):
 
         :param str webhook_name: An optional name for the webhook event.
 
+        :param Compressor compressor: An optional
+            :class:`Compressor <jook.compression.Compressor>` used to compress
+            the request body and set the ``Content-Encoding`` header.
+
+        :param PayloadShape shape: An optional :class:`PayloadShape
+            <jook.shapes.PayloadShape>` applied to the body by
+            :func:`to_json() <jook.models.webhooks.BaseWebhook.to_json>` and
+            :func:`to_xml() <jook.models.webhooks.BaseWebhook.to_xml>`.
+
         :raises InvalidEvent:
         :raises InvalidMode:
         :raises InvalidURL:
         :raises TypeError:
         """
+        from urlparse import urlparse
+
         if not url or not urlparse(url).scheme:
             raise InvalidURL(
                 "Must contain a scheme (e.g. 'http://', 'https://')."
@@ -91,6 +224,8 @@ class BaseWebhook(object):
             raise InvalidMode("Must be 'json' or 'xml'")
 
         self.timer = int(timer)
+        self.compressor = compressor
+        self.shape = shape
 
         self._webhook_data = {
             "webhook": {
@@ -121,7 +256,14 @@ class BaseWebhook(object):
         :return: JSON string
         :rtype: str
         """
-        return json.dumps(self.data)
+        import json
+
+        if not self.shape:
+            return json.dumps(self.data)
+
+        data = self.data
+        self.shape.apply(data["event"])
+        return self.shape.finish(json.dumps(data, ensure_ascii=False), 'json')
 
     def to_xml(self):
         """Return the object's ``data`` as XML.
@@ -129,27 +271,68 @@ class BaseWebhook(object):
         :return: XML string
         :rtype: str
         """
-        return dicttoxml(
-            self.data,
+        from dicttoxml import dicttoxml
+
+        data = self.data
+        if self.shape:
+            self.shape.apply(data["event"])
+
+        xml = dicttoxml(
+            data,
             custom_root='JSSEvent',
             attr_type=False
         )
 
-    def fire(self):
+        return self.shape.finish(xml, 'xml') if self.shape else xml
+
+    def render(self):
+        """Return the object's data encoded in its ``mode``, before any
+        compression.
+
+        :rtype: bytes
+        """
+        body = self.to_json() if self.mode == 'json' else self.to_xml()
+
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+
+        return body
+
+    def prepare(self):
+        """Render the object's data into a request that can be sent any number
+        of times.
+
+        The body is encoded in the object's ``mode`` and compressed if a
+        ``compressor`` is set, so ``body`` is exactly what is sent.
+
+        :return: A request with ``url``, ``headers``, ``body`` bytes and
+            the ``event`` it was prepared from
+        :rtype: PreparedWebhook
+        """
+        body = self.render()
+
+        encoding = None
+        if self.compressor:
+            body, encoding = self.compressor.compress(body)
+
+        return PreparedWebhook(
+            self.url, _headers(self.mode, encoding), body, self.event)
+
+    def fire(self, prepared=None):
         """Send a POST request containing the object's data in the specified
         data type to the stored URL.
+
+        :param PreparedWebhook prepared: An optional request from
+            :func:`prepare() <jook.models.webhooks.BaseWebhook.prepare>` to
+            send instead of rendering the object's data again.
         """
-        headers = {
-            'Content-Type': (
-                'application/json'
-                if self.mode == 'json'
-                else 'text/xml'
-            )
-        }
+        import requests
 
-        data = self.to_json() if self.mode == 'json' else self.to_xml()
+        if prepared is None:
+            prepared = self.prepare()
 
-        request = requests.post(self.url, headers=headers, data=data)
+        request = requests.post(
+            prepared.url, headers=prepared.headers, data=prepared.body)
 
         if not request.ok:
             request.raise_for_status()
@@ -176,24 +359,49 @@ class BaseDevice(BaseWebhook):
 
         :param DeviceData device:
         :param LocationData location:
+
+        :param bool realistic: If ``True``, the :class:`DeviceData` and
+            :class:`LocationData` objects created when none are passed are
+            populated from :mod:`jook.generators`.
+
+        :param Fleet fleet: An optional :class:`Fleet
+            <jook.models.fleet.Fleet>` to pick a device from each time
+            ``data`` is built. The ``device`` and ``location`` objects are
+            not used when a fleet is set.
         """
         super(BaseDevice, self).__init__(*args, **kwargs)
 
         device = kwargs.pop('device', None)
         location = kwargs.pop('location', None)
+        realistic = bool(kwargs.pop('realistic', False))
+        self.fleet = kwargs.pop('fleet', None)
 
         if device and isinstance(device, DeviceData):
             self.device = device
         else:
             self.device = DeviceData(
-                device_type=self.device_type, randomize=self.random
+                device_type=self.device_type, randomize=self.random,
+                realistic=realistic
             )
 
         if location and isinstance(location, LocationData):
             self.location = location
+        elif realistic:
+            self.location = generate_location()
         else:
             self.location = LocationData()
 
+    def member(self):
+        """Return the device and location data to use for the next event.
+
+        :return: A tuple of ``(DeviceData, LocationData)``
+        :rtype: tuple
+        """
+        if self.fleet is not None:
+            return self.fleet.member()
+
+        return self.device, self.location
+
 
 class Computer(BaseDevice):
     """The base BaseWebhook object for 'Computer' events."""
@@ -214,6 +422,8 @@ class Computer(BaseDevice):
         :return: ``data`` as a dictionary object
         :rtype: dict
         """
+        device, location = self.member()
+
         return {
             "webhook": {
                 "id": self.id,
@@ -221,23 +431,23 @@ class Computer(BaseDevice):
                 "webhookEvent": self.event
             },
             "event": {
-                "udid": self.device.uuid,
-                "deviceName": "",
-                "model": "",
-                "macAddress": self.device.mac_address,
-                "alternateMacAddress": self.device.mac_address_alt,
-                "serialNumber": self.device.serial_number,
-                "osVersion": "",
-                "osBuild": "",
+                "udid": device.uuid,
+                "deviceName": device.device_name,
+                "model": device.model,
+                "macAddress": device.mac_address,
+                "alternateMacAddress": device.mac_address_alt,
+                "serialNumber": device.serial_number,
+                "osVersion": device.os_version,
+                "osBuild": device.os_build,
                 "userDirectoryID": "-1",
-                "username": "{}".format(self.location.username),
-                "realName": "{}".format(self.location.realname),
-                "emailAddress": "{}".format(self.location.email),
-                "phone": "".format(self.location.phone),
-                "position": "{}".format(self.location.position),
-                "department": "{}".format(self.location.department),
-                "building": "{}".format(self.location.building),
-                "room": "{}".format(self.location.room),
+                "username": "{}".format(location.username),
+                "realName": "{}".format(location.realname),
+                "emailAddress": "{}".format(location.email),
+                "phone": "{}".format(location.phone),
+                "position": "{}".format(location.position),
+                "department": "{}".format(location.department),
+                "building": "{}".format(location.building),
+                "room": "{}".format(location.room),
                 "jssID": 1
             }
         }
@@ -262,6 +472,8 @@ class MobileDevice(BaseDevice):
         :return: ``data`` as a dictionary object
         :rtype: dict
         """
+        device, location = self.member()
+
         return {
             "webhook": {
                 "id": self.id,
@@ -269,22 +481,22 @@ class MobileDevice(BaseDevice):
                 "webhookEvent": self.event
             },
             "event": {
-                "udid": self.device.uuid,
-                "deviceName": "",
-                "version": "",
-                "model": "",
-                "bluetoothMacAddress": self.device.mac_address_alt,
-                "wifiMacAddress": self.device.mac_address,
-                "imei": "",
-                "icciID": "",
-                "product": "",
-                "serialNumber": self.device.serial_number,
+                "udid": device.uuid,
+                "deviceName": device.device_name,
+                "version": device.os_version,
+                "model": device.model,
+                "bluetoothMacAddress": device.mac_address_alt,
+                "wifiMacAddress": device.mac_address,
+                "imei": device.imei,
+                "icciID": device.iccid,
+                "product": device.model_identifier,
+                "serialNumber": device.serial_number,
                 "userDirectoryID": "-1",
-                "room": self.location.room,
-                "osVersion": "",
-                "osBuild": "",
-                "modelDisplay": "",
-                "username": self.location.username,
+                "room": location.room,
+                "osVersion": device.os_version,
+                "osBuild": device.os_build,
+                "modelDisplay": device.model,
+                "username": location.username,
                 "jssID": 1
             }
         }
@@ -362,6 +574,8 @@ class PatchTitle(BaseWebhook):
             updated. If not provided, or not a valid timestamp, it will be
             set to the current time.
         """
+        import datetime
+
         super(PatchTitle, self).__init__(
             event='PatchSoftwareTitleUpdated', *args, **kwargs)
 
@@ -400,4 +614,180 @@ class PatchTitle(BaseWebhook):
 
 
 class SmartGroup(BaseWebhook):
-    pass
+    """The base webhook object for 'Smart Group' membership change events.
+
+    Each event reports the IDs of devices added to and removed from the group.
+    :func:`to_json() <jook.models.webhooks.SmartGroup.to_json>` and
+    :func:`to_xml() <jook.models.webhooks.SmartGroup.to_xml>` write the ID
+    lists in chunks instead of serializing a nested ``data`` dictionary, so
+    groups with tens of thousands of changes stay cheap to render.
+    """
+    valid_events = (
+        'SmartGroupComputerMembershipChange',
+        'SmartGroupMobileDeviceMembershipChange'
+    )
+
+    def __init__(self, *args, **kwargs):
+        """
+        :param int jss_id: ID of the Smart Group in Jamf Pro (defaults to 1).
+
+        :param str group_name: The Smart Group name (defaults to
+            'Smart Group').
+
+        :param int added: The number of devices added to the group in each
+            event (defaults to 1).
+
+        :param int removed: The number of devices removed from the group in
+            each event (defaults to 0).
+
+        :param Fleet fleet: An optional :class:`Fleet
+            <jook.models.fleet.Fleet>` to draw the changed devices from. The
+            device IDs are the fleet indexes plus one. If not provided the IDs
+            are numbered sequentially from 1.
+
+        :param int chunk_size: The number of IDs written at a time when
+            rendering the event (defaults to 1024).
+
+        :raises JookException: ``added`` plus ``removed`` is more than the
+            number of devices in ``fleet``.
+        """
+        super(SmartGroup, self).__init__(*args, **kwargs)
+
+        self.jss_id = kwargs.pop('jss_id', 1)
+        self.group_name = kwargs.pop('group_name', 'Smart Group')
+        self.added = int(kwargs.pop('added', 1))
+        self.removed = int(kwargs.pop('removed', 0))
+        self.fleet = kwargs.pop('fleet', None)
+        self.chunk_size = int(kwargs.pop('chunk_size', 1024))
+
+        # Fleets only grow, so a group that fits now always will.
+        if self.fleet is not None and \
+                self.added + self.removed > self.fleet.size:
+            raise JookException(
+                'Cannot change {} devices in a fleet of {}'.format(
+                    self.added + self.removed, self.fleet.size))
+
+    @property
+    def is_computer(self):
+        """Return ``True`` if the event is for a computer Smart Group."""
+        return self.event == 'SmartGroupComputerMembershipChange'
+
+    def membership(self):
+        """Return the IDs of the devices added to and removed from the group
+        for the next event.
+
+        :return: A tuple of ``(added_ids, removed_ids)`` lists
+        :rtype: tuple
+        """
+        total = self.added + self.removed
+
+        if self.fleet is not None:
+            ids = [index + 1 for index in self.fleet.sample(total)]
+        else:
+            ids = list(range(1, total + 1))
+
+        return ids[:self.added], ids[self.added:]
+
+    def _event_fields(self):
+        """Return the event's key-values other than the device ID lists."""
+        fields = {
+            "name": self.group_name,
+            "smartGroup": True,
+            "jssid": self.jss_id,
+            "computer": self.is_computer,
+            "groupAddedDevices": [],
+            "groupRemovedDevices": []
+        }
+
+        return self.shape.apply(fields) if self.shape else fields
+
+    def _id_chunks(self, ids, template, separator):
+        """Yield the IDs as strings of ``chunk_size`` formatted values."""
+        size = self.chunk_size
+        for start in xrange(0, len(ids), size):
+            chunk = separator.join(
+                [template % device_id for device_id in ids[start:start + size]]
+            )
+            yield chunk if start == 0 else separator + chunk
+
+    @property
+    def data(self):
+        """Return ``data`` for the object as a dictionary.
+
+        For large groups prefer :func:`to_json()
+        <jook.models.webhooks.SmartGroup.to_json>` or :func:`to_xml()
+        <jook.models.webhooks.SmartGroup.to_xml>`, which do not build this
+        dictionary.
+
+        :return: ``data`` as a dictionary object
+        :rtype: dict
+        """
+        added, removed = self.membership()
+
+        event = self._event_fields()
+        event["groupAddedDevicesIds"] = added
+        event["groupRemovedDevicesIds"] = removed
+
+        data = {"event": event}
+        data.update(self._webhook_data)
+        return data
+
+    def iter_json(self):
+        """Yield the event as JSON in chunks.
+
+        :rtype: generator
+        """
+        import json
+
+        added, removed = self.membership()
+
+        yield '{"webhook": '
+        yield json.dumps(self._webhook_data["webhook"])
+        yield ', "event": {'
+        yield json.dumps(self._event_fields(), ensure_ascii=False)[1:-1]
+        yield ', "groupAddedDevicesIds": ['
+        for chunk in self._id_chunks(added, '%d', ', '):
+            yield chunk
+        yield '], "groupRemovedDevicesIds": ['
+        for chunk in self._id_chunks(removed, '%d', ', '):
+            yield chunk
+        yield ']}}'
+
+    def iter_xml(self):
+        """Yield the event as XML in chunks.
+
+        :rtype: generator
+        """
+        from dicttoxml import dicttoxml
+
+        added, removed = self.membership()
+
+        yield '<?xml version="1.0" encoding="UTF-8" ?><JSSEvent>'
+        yield dicttoxml(self._webhook_data, root=False, attr_type=False)
+        yield '<event>'
+        yield dicttoxml(self._event_fields(), root=False, attr_type=False)
+        yield '<groupAddedDevicesIds>'
+        for chunk in self._id_chunks(added, '<item>%d</item>', ''):
+            yield chunk
+        yield '</groupAddedDevicesIds><groupRemovedDevicesIds>'
+        for chunk in self._id_chunks(removed, '<item>%d</item>', ''):
+            yield chunk
+        yield '</groupRemovedDevicesIds></event></JSSEvent>'
+
+    def to_json(self):
+        """Return the event as JSON.
+
+        :return: JSON string
+        :rtype: str
+        """
+        body = ''.join(self.iter_json())
+        return self.shape.finish(body, 'json') if self.shape else body
+
+    def to_xml(self):
+        """Return the event as XML.
+
+        :return: XML string
+        :rtype: str
+        """
+        body = ''.join(self.iter_xml())
+        return self.shape.finish(body, 'xml') if self.shape else body
@@ -0,0 +1,291 @@
+"""
+This module contains an opt-in profiler that breaks down where time is spent
+generating and sending webhook events.
+
+Nothing is instrumented until :func:`Profiler.start()
+<jook.profiling.Profiler.start>` is called: the profiler wraps the identifier
+generators, ``data``, serialization, compression and send methods while it is
+running and restores the originals when it stops, so there is no cost when
+profiling is off.
+
+Time is recorded per event type and stage. Stage times exclude the time spent
+in nested stages, e.g. the ``serialize`` time of ``to_json()`` does not
+include building ``data``. Senders are credited to the ``event`` of the
+:class:`PreparedWebhook <jook.models.webhooks.PreparedWebhook>` they send, and
+the time of a batch is split evenly across its requests.
+"""
+import signal
+import sys
+import threading
+import timeit
+from collections import Counter
+
+from . import generators
+from .compression import Compressor
+from .exceptions import JookException
+from .models import data_sets, webhooks
+from .senders import Sender
+
+UNATTRIBUTED = '-'
+
+# Module level functions to instrument: (module, name, stage).
+FUNCTIONS = (
+    (data_sets, 'generate_mac_address', 'identifiers'),
+    (data_sets, 'generate_serial', 'identifiers'),
+    (data_sets, 'generate_uuid', 'identifiers'),
+    (generators, 'generate_model', 'generators'),
+    (generators, 'generate_operating_system', 'generators'),
+    (generators, 'generate_imei', 'generators'),
+    (generators, 'generate_iccid', 'generators'),
+    (generators, 'generate_location', 'generators'),
+    (webhooks, 'generate_location', 'generators')
+)
+
+# Methods to instrument on webhook classes and their subclasses.
+WEBHOOK_METHODS = (
+    ('data', 'data'),
+    ('to_json', 'serialize'),
+    ('to_xml', 'serialize'),
+    ('prepare', 'prepare'),
+    ('fire', 'network')
+)
+
+_active = None
+
+
+def _subclasses(cls):
+    """Return a class and all of its subclasses."""
+    classes = [cls]
+    for subclass in cls.__subclasses__():
+        classes.extend(_subclasses(subclass))
+    return classes
+
+
+class Profiler(object):
+    """Collects per-event, per-stage call counts and times.
+
+    Can be used as a context manager::
+
+        with Profiler() as profiler:
+            computer.start_timer(repeat=1000)
+        print(profiler.format_report())
+    """
+    def __init__(self, sample_interval=None):
+        """
+        :param float sample_interval: If set, also run a sampling profiler
+            that records the current stage and function every
+            ``sample_interval`` seconds of CPU time. The sampler uses
+            ``SIGPROF`` and only samples the main thread.
+        """
+        self.sample_interval = sample_interval
+        self.stages = {}
+        self.samples = Counter()
+        self.hotspots = Counter()
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._patched = []
+        self._previous_handler = None
+        self._sampling = False
+
+    def _stack(self):
+        """Return the stage stack for the current thread."""
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
+
+    def _call(self, func, stage, args, kwargs, batch=False):
+        """Call an instrumented function and record its time.
+
+        The event is taken from a webhook method's object, a sender's
+        prepared request, or else the enclosing stage. If ``batch`` is set the
+        second argument is a list of prepared requests and each request is
+        counted as one call.
+        """
+        stack = self._stack()
+        event = stack[-1][0] if stack else UNATTRIBUTED
+
+        if batch:
+            prepared_requests = list(args[1])
+            args = (args[0], prepared_requests) + tuple(args[2:])
+            events = Counter(
+                getattr(prepared, 'event', None) or event
+                for prepared in prepared_requests)
+            if len(events) == 1:
+                event = next(iter(events))
+        else:
+            for arg in args[:2]:
+                if getattr(arg, 'event', None):
+                    event = arg.event
+                    break
+            events = Counter({event: 1})
+
+        frame = [event, stage, 0.0]
+        stack.append(frame)
+        start = timeit.default_timer()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = timeit.default_timer() - start
+            stack.pop()
+            if stack:
+                stack[-1][2] += elapsed
+
+            share = (elapsed - frame[2]) / max(sum(events.values()), 1)
+            with self._lock:
+                for name, calls in events.items():
+                    totals = self.stages.setdefault((name, stage), [0, 0.0])
+                    totals[0] += calls
+                    totals[1] += share * calls
+
+    def _wrap(self, func, stage, batch=False):
+        """Return an instrumented version of a function."""
+        call = self._call
+
+        def wrapper(*args, **kwargs):
+            return call(func, stage, args, kwargs, batch)
+
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+
+    def _patch(self, owner, name, stage, batch=False):
+        """Replace an attribute with an instrumented version."""
+        original = owner.__dict__[name] if isinstance(owner, type) \
+            else getattr(owner, name)
+
+        if isinstance(original, property):
+            replacement = property(
+                self._wrap(original.fget, stage), doc=original.__doc__)
+        else:
+            replacement = self._wrap(original, stage, batch)
+
+        setattr(owner, name, replacement)
+        self._patched.append((owner, name, original))
+
+    def _sample(self, signum, frame):
+        """Record the current stage and function for the sampler."""
+        stack = self._stack()
+        key = (stack[-1][0], stack[-1][1]) if stack \
+            else (UNATTRIBUTED, UNATTRIBUTED)
+        self.samples[key] += 1
+
+        if frame is not None:
+            code = frame.f_code
+            self.hotspots['{}:{} {}'.format(
+                code.co_filename, frame.f_lineno, code.co_name)] += 1
+
+    def start(self):
+        """Instrument Jook and start collecting.
+
+        If Jook cannot be fully instrumented, nothing is left patched.
+
+        :raises JookException: Another profiler is already running, or
+            ``sample_interval`` was set and this is not the main thread.
+        """
+        global _active
+
+        if _active is not None:
+            raise JookException('A profiler is already running')
+
+        if self.sample_interval:
+            # Only the main thread can install a signal handler, so fail
+            # before anything is patched.
+            try:
+                self._previous_handler = signal.signal(
+                    signal.SIGPROF, self._sample)
+            except ValueError:
+                raise JookException(
+                    'The sampler can only be started from the main thread')
+            self._sampling = True
+
+        try:
+            for module, name, stage in FUNCTIONS:
+                self._patch(module, name, stage)
+
+            for cls in _subclasses(webhooks.BaseWebhook):
+                for name, stage in WEBHOOK_METHODS:
+                    if name in cls.__dict__:
+                        self._patch(cls, name, stage)
+
+            self._patch(Compressor, 'compress', 'compress')
+            self._patch(Sender, 'send', 'network')
+
+            if 'jook.http2' in sys.modules:
+                http2 = sys.modules['jook.http2']
+                self._patch(http2.HTTP2Connection, 'send_batch', 'network',
+                            batch=True)
+
+            if self._sampling:
+                signal.setitimer(
+                    signal.ITIMER_PROF, self.sample_interval,
+                    self.sample_interval)
+        except Exception:
+            self.stop()
+            raise
+
+        _active = self
+
+    def stop(self):
+        """Stop collecting and restore the original functions."""
+        global _active
+
+        if self._sampling:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self._previous_handler or
+                          signal.SIG_DFL)
+            self._sampling = False
+
+        while self._patched:
+            owner, name, original = self._patched.pop()
+            setattr(owner, name, original)
+
+        if _active is self:
+            _active = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def report(self):
+        """Return the collected times grouped by event type and stage.
+
+        :return: ``{event: {stage: {'calls': int, 'seconds': float,
+            'samples': int}}}``
+        :rtype: dict
+        """
+        report = {}
+        with self._lock:
+            for (event, stage), (calls, seconds) in self.stages.items():
+                report.setdefault(event, {})[stage] = {
+                    'calls': calls,
+                    'seconds': seconds,
+                    'samples': self.samples.get((event, stage), 0)
+                }
+
+        return report
+
+    def format_report(self):
+        """Return the report as a text table, with the slowest stage of each
+        event type first.
+
+        :rtype: str
+        """
+        lines = ['{:<40} {:<12} {:>10} {:>12} {:>10}'.format(
+            'event', 'stage', 'calls', 'seconds', 'samples')]
+
+        for event, stages in sorted(self.report().items()):
+            ordered = sorted(
+                stages.items(), key=lambda item: item[1]['seconds'],
+                reverse=True)
+            for stage, totals in ordered:
+                lines.append('{:<40} {:<12} {:>10} {:>12.6f} {:>10}'.format(
+                    event, stage, totals['calls'], totals['seconds'],
+                    totals['samples']))
+
+        return '\n'.join(lines)
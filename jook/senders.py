@@ -0,0 +1,129 @@
+"""
+This module contains senders for :class:`PreparedWebhook
+<jook.models.webhooks.PreparedWebhook>` objects.
+
+All senders share the same interface: ``send()`` for a single request and
+``send_batch()`` for a list of requests.
+"""
+
+
+def pooled_session(size):
+    """Return a ``requests.Session`` that keeps up to ``size`` connections
+    per host, so that many threads can send at once without discarding
+    connections.
+
+    :param int size:
+
+    :rtype: requests.Session
+    """
+    import requests
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=size, pool_maxsize=size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class Sender(object):
+    """Sends prepared webhooks one at a time over a keep-alive session."""
+    def __init__(self, session=None, timeout=None):
+        """
+        :param session: An optional ``requests.Session`` to send with.
+
+        :param float timeout: An optional timeout in seconds for each request.
+        """
+        if session is None:
+            import requests
+            session = requests.Session()
+
+        self.session = session
+        self.timeout = timeout
+
+    def send(self, prepared):
+        """Send a prepared webhook.
+
+        :param PreparedWebhook prepared:
+
+        :return: The response
+        :rtype: requests.Response
+
+        :raises requests.HTTPError: The receiver returned an error status.
+        """
+        response = self.session.post(
+            prepared.url,
+            headers=prepared.headers,
+            data=prepared.body,
+            timeout=self.timeout
+        )
+
+        if not response.ok:
+            response.raise_for_status()
+
+        return response
+
+    def send_batch(self, prepared_requests):
+        """Send a list of prepared webhooks in order.
+
+        :param list prepared_requests:
+
+        :return: The responses in the same order
+        :rtype: list
+        """
+        return [self.send(prepared) for prepared in prepared_requests]
+
+    def close(self):
+        """Close the session."""
+        self.session.close()
+
+
+class AsyncSender(Sender):
+    """Sends prepared webhooks concurrently from a pool of threads."""
+    def __init__(self, workers=10, session=None, timeout=None):
+        """
+        :param int workers: The number of requests in flight at once.
+
+        :param session: An optional ``requests.Session`` to send with. The
+            default session keeps up to ``workers`` connections per host.
+
+        :param float timeout: An optional timeout in seconds for each request.
+        """
+        from multiprocessing.pool import ThreadPool
+
+        self.workers = int(workers)
+
+        if session is None:
+            session = pooled_session(self.workers)
+
+        super(AsyncSender, self).__init__(session=session, timeout=timeout)
+
+        self._pool = ThreadPool(self.workers)
+
+    def submit(self, prepared):
+        """Start sending a prepared webhook in the background.
+
+        :param PreparedWebhook prepared:
+
+        :return: A result whose ``get()`` method returns the response or
+            raises the error from :func:`send()
+            <jook.senders.Sender.send>`.
+        :rtype: multiprocessing.pool.AsyncResult
+        """
+        return self._pool.apply_async(self.send, (prepared,))
+
+    def send_batch(self, prepared_requests):
+        """Send a list of prepared webhooks concurrently.
+
+        :param list prepared_requests:
+
+        :return: The responses in the same order
+        :rtype: list
+        """
+        return self._pool.map(self.send, prepared_requests)
+
+    def close(self):
+        """Shut down the thread pool and close the session."""
+        self._pool.close()
+        self._pool.join()
+        super(AsyncSender, self).close()
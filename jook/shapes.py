@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+This module contains payload shape profiles for stress testing how receivers
+parse large or unusual webhook bodies.
+
+A :class:`PayloadShape` is applied on top of an event's normal schema: it pads
+string fields, swaps names for long Unicode strings, nests deep elements and
+pads the body to a target size. Filler strings are cached and reused, so large
+payload runs do not spend their time building the same strings.
+"""
+from .exceptions import JookException
+
+# Every string field in the event.
+ALL_FIELDS = '*'
+
+# Event fields that hold names of people, devices or objects.
+NAME_FIELDS = (
+    'name', 'deviceName', 'realName', 'username', 'institution'
+)
+
+UNICODE_SAMPLE = (
+    u'Zoë Ångström-Øster 山田太郎 Ђорђе Đặng Thị Hương '
+    u'محمد بن سلمان Ñandú Łukasz Żółć 김민준 '
+)
+
+
+class PayloadShape(object):
+    """A set of changes applied to a webhook's body before it is sent.
+
+    Pass an instance as the ``shape`` argument of any webhook object.
+    """
+    def __init__(self, pad_fields=(), pad_length=0, unicode_names=False,
+                 unicode_length=128, depth=0, target_size=None):
+        """
+        :param pad_fields: Names of the event's string fields to pad, or
+            ``'*'`` for every string field.
+
+        :param int pad_length: Characters appended to each padded field.
+
+        :param bool unicode_names: Replace the event's name fields (see
+            ``NAME_FIELDS``) with multi-script Unicode strings.
+
+        :param int unicode_length: The length of the Unicode names.
+
+        :param int depth: Add a ``nested`` element this many levels deep to
+            the body.
+
+        :param int target_size: Add a ``padding`` element so that the encoded
+            body is this many bytes (bodies already larger are left alone).
+
+        :raises JookException: A negative size was passed.
+        """
+        if min(pad_length, unicode_length, depth, target_size or 0) < 0:
+            raise JookException('Sizes cannot be negative')
+
+        self.pad_fields = pad_fields
+        self.pad_length = int(pad_length)
+        self.unicode_names = unicode_names
+        self.unicode_length = int(unicode_length)
+        self.depth = int(depth)
+        self.target_size = target_size
+
+        self._field_filler = b'x' * self.pad_length
+        self._padding = None
+        self._nested = {}
+        self._unicode_name = (
+            UNICODE_SAMPLE * (self.unicode_length // len(UNICODE_SAMPLE) + 1)
+        )[:self.unicode_length]
+
+    def _filler(self, length):
+        """Return ``length`` characters of padding for the body.
+
+        Every body needs a different amount, so they are all sliced from one
+        cached string of ``target_size`` characters.
+        """
+        if self._padding is None:
+            self._padding = b'x' * self.target_size
+        return self._padding[:length]
+
+    def _nesting(self, mode):
+        """Return the cached ``nested`` element for a data mode."""
+        try:
+            return self._nested[mode]
+        except KeyError:
+            depth = self.depth
+            if mode == 'json':
+                nested = b'{"nested": ' * (depth - 1) + b'{}' + \
+                    b'}' * (depth - 1) if depth else b''
+            else:
+                nested = b'<nested>' * depth + b'</nested>' * depth
+            self._nested[mode] = nested
+            return nested
+
+    def apply(self, event):
+        """Change the fields of an event dictionary in place.
+
+        :param dict event: The ``event`` key-values of a webhook's data.
+
+        :return: The same dictionary
+        :rtype: dict
+        """
+        if self.pad_length and self.pad_fields:
+            filler = self._field_filler
+            names = event.keys() if self.pad_fields == ALL_FIELDS \
+                else self.pad_fields
+            for name in names:
+                value = event.get(name)
+                if isinstance(value, basestring):
+                    event[name] = value + filler
+
+        if self.unicode_names:
+            for name in NAME_FIELDS:
+                if name in event:
+                    event[name] = self._unicode_name
+
+        return event
+
+    def finish(self, body, mode):
+        """Add the nested and padding elements to an encoded body.
+
+        :param body: The serialized body.
+
+        :param str mode: 'json' or 'xml'
+
+        :return: The UTF-8 encoded body
+        :rtype: bytes
+        """
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+
+        if not self.depth and not self.target_size:
+            return body
+
+        nested = self._nesting(mode)
+
+        if mode == 'json':
+            head = body[:-1]
+            if nested:
+                head += b', "nested": ' + nested
+            tail = b'}'
+            pad_open, pad_close = b', "padding": "', b'"'
+        else:
+            head = body[:-len(b'</JSSEvent>')] + nested
+            tail = b'</JSSEvent>'
+            pad_open, pad_close = b'<padding>', b'</padding>'
+
+        size = len(head) + len(tail)
+        if self.target_size:
+            needed = self.target_size - size - len(pad_open) - len(pad_close)
+            if needed >= 0:
+                return b''.join(
+                    (head, pad_open, self._filler(needed), pad_close, tail))
+
+        return head + tail
+
+
+PROFILES = {
+    'padded': PayloadShape(pad_fields=ALL_FIELDS, pad_length=4096),
+    'unicode': PayloadShape(unicode_names=True, unicode_length=1024),
+    'deep': PayloadShape(depth=2000),
+    'large': PayloadShape(target_size=1024 * 1024)
+}
@@ -0,0 +1,243 @@
+"""
+This module contains the soak mode for running a webhook against a receiver
+for long periods with bounded memory.
+"""
+import json
+import os
+import threading
+import time
+import timeit
+from collections import deque
+
+from .stats import LatencyStats
+
+
+def current_rss():
+    """Return the resident set size of this process in bytes.
+
+    Reads ``/proc/self/statm`` where available and otherwise falls back to the
+    peak RSS reported by ``getrusage()``.
+
+    :rtype: int
+    """
+    try:
+        with open('/proc/self/statm') as fobj:
+            pages = int(fobj.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, IndexError):
+        import resource
+        import sys
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes and macOS reports bytes.
+        return rss if sys.platform == 'darwin' else rss * 1024
+
+
+class Soak(object):
+    """Sends a webhook at a fixed or scheduled rate for as long as required.
+
+    Requests are sent from a pool of ``concurrency`` threads, and latency is
+    measured from the time each event was scheduled to be sent. A receiver
+    that cannot keep up shows up as growing latency instead of a lower send
+    rate that hides the queueing delay.
+
+    Only the current window is held in memory: every ``window`` seconds the
+    window's stats are rolled up, written as one JSON line to ``rollup_path``
+    and reset. Each rollup includes Jook's own RSS and the time spent
+    generating events, so drift in the generator can be told apart from
+    receiver degradation.
+    """
+    def __init__(self, webhook, sender=None, rate=1.0, schedule=None,
+                 window=60.0, rollup_path=None, error_samples=20,
+                 history=60, concurrency=10):
+        """
+        :param webhook: The webhook object to send. A new request is prepared
+            for each event with :func:`prepare()
+            <jook.models.webhooks.BaseWebhook.prepare>`.
+
+        :param sender: The sender to use. Defaults to a
+            :class:`Sender <jook.senders.Sender>` that keeps ``concurrency``
+            connections open.
+
+        :param float rate: Events per second. ``None`` sends events as fast
+            as ``concurrency`` allows.
+
+        :param schedule: An optional function that takes the seconds elapsed
+            since the run started and returns the rate to use. Overrides
+            ``rate``.
+
+        :param float window: Seconds between rollups.
+
+        :param str rollup_path: An optional file to append rollups to as JSON
+            lines.
+
+        :param int error_samples: The most error messages kept for each
+            window.
+
+        :param int history: The number of recent rollups kept in
+            ``rollups``.
+
+        :param int concurrency: The most requests in flight at once. The
+            sender's ``send()`` method is called from this many threads.
+        """
+        self.webhook = webhook
+        self.sender = sender
+        self.rate = float(rate) if rate is not None else None
+        self.schedule = schedule
+        self.window = float(window)
+        self.rollup_path = rollup_path
+        self.concurrency = int(concurrency)
+
+        self.rollups = deque(maxlen=history)
+        self.stats = LatencyStats()
+        self.error_samples = deque(maxlen=error_samples)
+
+        self._generation_seconds = 0.0
+        self._stop = threading.Event()
+        self._lock = threading.RLock()
+
+    def stop(self):
+        """Stop a running soak after the current event."""
+        self._stop.set()
+
+    def _send(self, prepared, scheduled, slots):
+        """Send one event from the pool and record its latency from the time
+        it was scheduled.
+        """
+        clock = timeit.default_timer
+
+        try:
+            self.sender.send(prepared)
+        except Exception as err:
+            with self._lock:
+                self.stats.record(clock() - scheduled, error=True)
+                self.error_samples.append(
+                    '{}: {}'.format(err.__class__.__name__, err))
+        else:
+            with self._lock:
+                self.stats.record(clock() - scheduled)
+        finally:
+            slots.release()
+
+    def rollup(self, elapsed, window_seconds, rate):
+        """Summarize the current window, write it out and reset it.
+
+        :param float elapsed: Seconds since the run started.
+        :param float window_seconds: The length of the window.
+        :param float rate: The target rate during the window.
+
+        :return: The rollup
+        :rtype: dict
+        """
+        with self._lock:
+            stats = self.stats
+            summary = stats.as_dict()
+            summary.update({
+                'time': time.time(),
+                'elapsed': elapsed,
+                'targetRate': rate,
+                'throughput': stats.count / window_seconds
+                if window_seconds else 0.0,
+                'generationSeconds': self._generation_seconds / stats.count
+                if stats.count else 0.0,
+                'rssBytes': current_rss(),
+                'errorSamples': list(self.error_samples)
+            })
+
+            stats.reset()
+            self.error_samples.clear()
+            self._generation_seconds = 0.0
+
+        if self.rollup_path:
+            with open(self.rollup_path, 'a') as fobj:
+                fobj.write(json.dumps(summary, sort_keys=True) + '\n')
+
+        self.rollups.append(summary)
+
+        return summary
+
+    def run(self, duration=None, count=None):
+        """Send events until ``duration`` seconds have passed, ``count``
+        events have been sent or :func:`stop() <jook.soak.Soak.stop>` is
+        called.
+
+        Events are paced against the start of the run, so a slow send is made
+        up for by the following events instead of lowering the rate. When all
+        ``concurrency`` threads are busy the next event waits for one, and
+        the wait is counted in its latency. Events more than one ``window``
+        behind schedule are skipped.
+
+        If neither ``duration`` nor ``count`` is provided the soak runs until
+        stopped.
+
+        :param float duration: Optional number of seconds to run for.
+
+        :param int count: Optional number of events to send.
+        """
+        from multiprocessing.pool import ThreadPool
+
+        if self.sender is None:
+            from .senders import Sender, pooled_session
+            self.sender = Sender(
+                session=pooled_session(self.concurrency))
+
+        pool = ThreadPool(self.concurrency)
+        slots = threading.BoundedSemaphore(self.concurrency)
+
+        clock = timeit.default_timer
+        started = clock()
+        window_started = started
+        next_event = started
+        rate = self.rate
+        sent = 0
+        self._stop.clear()
+
+        while not self._stop.is_set():
+            now = clock()
+            elapsed = now - started
+
+            if duration is not None and elapsed >= duration:
+                break
+
+            if count is not None and sent >= count:
+                break
+
+            rate = self.schedule(elapsed) if self.schedule else self.rate
+
+            if now - window_started >= self.window:
+                self.rollup(elapsed, now - window_started, rate)
+                window_started = now
+
+            if now < next_event:
+                time.sleep(min(next_event - now, 0.1))
+                continue
+
+            if rate is not None and rate <= 0:
+                next_event = now + 0.1
+                continue
+
+            if not slots.acquire(False):
+                time.sleep(0.001)
+                continue
+
+            if rate is None:
+                scheduled = next_event = now
+            else:
+                # Do not let a stall turn into an unbounded burst later on.
+                scheduled = max(next_event, now - self.window)
+                next_event = scheduled + 1.0 / rate
+
+            start = clock()
+            prepared = self.webhook.prepare()
+            with self._lock:
+                self._generation_seconds += clock() - start
+
+            pool.apply_async(self._send, (prepared, scheduled, slots))
+            sent += 1
+
+        pool.close()
+        pool.join()
+
+        now = clock()
+        if self.stats.count:
+            self.rollup(now - started, now - window_started, rate)
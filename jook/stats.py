@@ -0,0 +1,142 @@
+"""
+This module contains fixed-size latency statistics for load runs.
+"""
+import threading
+from bisect import bisect_left
+
+# Upper bounds in seconds of the latency histogram buckets. Each bucket is 10%
+# wider than the one before it, from 100 microseconds to just over a minute,
+# so percentiles are accurate to within 10% with a fixed amount of memory.
+BUCKET_BOUNDS = tuple(0.0001 * 1.1 ** i for i in range(142))
+
+
+class LatencyStats(object):
+    """Request, error and latency totals kept in a fixed-size histogram."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear all recorded values."""
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+
+    def record(self, seconds, error=False):
+        """Record the latency of one request.
+
+        :param float seconds: The request latency.
+
+        :param bool error: ``True`` if the request failed.
+        """
+        bucket = bisect_left(BUCKET_BOUNDS, seconds)
+
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.buckets[bucket] += 1
+            if seconds > self.max:
+                self.max = seconds
+            if error:
+                self.errors += 1
+
+    def merge(self, other):
+        """Add the values recorded by another :class:`LatencyStats` object.
+
+        :param LatencyStats other:
+        """
+        with self._lock:
+            self.count += other.count
+            self.errors += other.errors
+            self.total += other.total
+            self.max = max(self.max, other.max)
+            self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def compact(self):
+        """Return the raw values as a small dictionary that can be sent as
+        JSON and merged with :func:`from_compact()
+        <jook.stats.LatencyStats.from_compact>`. Empty buckets are left out.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'count': self.count,
+                'errors': self.errors,
+                'total': self.total,
+                'max': self.max,
+                'buckets': dict(
+                    (str(index), count)
+                    for index, count in enumerate(self.buckets) if count
+                )
+            }
+
+    @classmethod
+    def from_compact(cls, values):
+        """Create a :class:`LatencyStats` object from :func:`compact()
+        <jook.stats.LatencyStats.compact>` values.
+
+        :param dict values:
+
+        :rtype: LatencyStats
+        """
+        stats = cls()
+        stats.count = values['count']
+        stats.errors = values['errors']
+        stats.total = values['total']
+        stats.max = values['max']
+        for index, count in values['buckets'].items():
+            stats.buckets[int(index)] = count
+        return stats
+
+    @property
+    def mean(self):
+        """Return the mean latency in seconds."""
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def error_rate(self):
+        """Return the fraction of requests that failed."""
+        return float(self.errors) / self.count if self.count else 0.0
+
+    def percentile(self, percent):
+        """Return the latency in seconds below which ``percent`` of requests
+        completed.
+
+        The value is the upper bound of the histogram bucket containing the
+        percentile, capped at the largest latency seen.
+
+        :param float percent: A value from ``0`` to ``100``.
+
+        :rtype: float
+        """
+        if not self.count:
+            return 0.0
+
+        rank = self.count * percent / 100.0
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                if index == len(BUCKET_BOUNDS):
+                    return self.max
+                return min(BUCKET_BOUNDS[index], self.max)
+
+        return self.max
+
+    def as_dict(self):
+        """Return a summary of the stats as a dictionary.
+
+        :rtype: dict
+        """
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'mean': self.mean,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.max
+        }
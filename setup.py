@@ -32,5 +32,8 @@ setup(
         'dicttoxml>=1.7',
         'requests>=2.11'
     ],
+    extras_require={
+        'http2': ['h2>=3,<4']
+    },
     zip_safe=False
 )
@@ -1,16 +1,53 @@
+# -*- coding: utf-8 -*-
+import BaseHTTPServer
 import json
+import multiprocessing
+import socket
+import subprocess
+import sys
+import threading
+import time
 import xml.etree.ElementTree as Et
+import zlib
 
 import pytest
 import responses
 
 import jook
+from jook import generators, shapes
+from jook.distributed import Coordinator, Worker, start_local_workers
+from jook.load import AdaptiveLoad
 from jook.models.webhooks import BaseWebhook
-from jook.exceptions import InvalidEvent, InvalidURL
+from jook.profiling import Profiler
+from jook.soak import Soak
+from jook.stats import LatencyStats
+from jook.exceptions import (
+    InvalidEvent, InvalidMode, InvalidURL, JookException
+)
 
 
 URL = 'http://localhost'
 
+# Seconds allowed for ``import jook`` in a fresh interpreter.
+IMPORT_TIME_BUDGET = 0.1
+
+
+def test_import_is_lazy():
+    script = (
+        'import sys, timeit\n'
+        'start = timeit.default_timer()\n'
+        'import jook\n'
+        'elapsed = timeit.default_timer() - start\n'
+        'print(elapsed)\n'
+        'print(",".join(m for m in ("requests", "dicttoxml", "uuid") '
+        'if m in sys.modules))\n'
+    )
+    output = subprocess.check_output([sys.executable, '-c', script])
+    elapsed, loaded = output.decode().splitlines()
+
+    assert float(elapsed) < IMPORT_TIME_BUDGET
+    assert loaded == ''
+
 
 def test_url_scheme_required():
     with pytest.raises(InvalidURL):
@@ -24,7 +61,7 @@ def test_events():
         jook.JamfPro
     )
 
-    for event in events:
+    for event in events + (jook.SmartGroup,):
         for valid_event in event.valid_events:
             assert event(URL, valid_event)
 
@@ -75,9 +112,916 @@ def test_data_modes():
         jook.Computer(URL, 'ComputerInventoryCompleted'),
         jook.MobileDevice(URL, 'MobileDeviceEnrolled'),
         jook.JamfPro(URL, 'JSSShutdown'),
-        jook.PatchTitle(URL)
+        jook.PatchTitle(URL),
+        jook.SmartGroup(URL, 'SmartGroupComputerMembershipChange')
     )
 
     for event in events:
         assert json.loads(event.to_json())
         assert Et.fromstring(event.to_xml())
+
+
+def test_compressor():
+    with pytest.raises(InvalidMode):
+        jook.Compressor('brotli')
+
+    compressor = jook.Compressor('gzip', threshold=100)
+
+    body, encoding = compressor.compress('a' * 10)
+    assert (body, encoding) == ('a' * 10, None)
+
+    body, encoding = compressor.compress('a' * 1000)
+    assert encoding == 'gzip'
+    assert zlib.decompress(body, 16 + zlib.MAX_WBITS) == 'a' * 1000
+
+    assert compressor.stats.bodies == 2
+    assert compressor.stats.compressed == 1
+    assert compressor.stats.bytes_in == 1010
+    assert compressor.stats.bytes_saved == 1010 - compressor.stats.bytes_out
+    assert compressor.stats.compress_seconds > 0
+
+
+def test_compressor_pool():
+    compressor = jook.Compressor('deflate', threshold=0, workers=4)
+    bodies = [str(i) * 2000 for i in range(20)]
+
+    results = compressor.compress_many(bodies)
+    compressor.close()
+
+    assert [zlib.decompress(body) for body, _ in results] == bodies
+    assert compressor.stats.compressed == 20
+
+
+def test_group_prepare_uses_compressor_pool(monkeypatch):
+    compressor = jook.Compressor(threshold=0, workers=2)
+    batches = []
+    compress_many = compressor.compress_many
+    monkeypatch.setattr(
+        compressor, 'compress_many',
+        lambda bodies: batches.append(len(bodies)) or compress_many(bodies))
+
+    group = jook.Jook([
+        jook.Computer(URL, 'ComputerCheckIn', compressor=compressor),
+        jook.JamfPro(URL, 'JSSStartup'),
+        jook.PatchTitle(URL, mode='xml', compressor=compressor)
+    ])
+    prepared = group.prepare()
+    compressor.close()
+
+    assert batches == [2]
+    assert prepared[0].headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Encoding' not in prepared[1].headers
+    assert Et.fromstring(zlib.decompress(
+        prepared[2].body, 16 + zlib.MAX_WBITS)) is not None
+
+
+@responses.activate
+def test_fire_compressed():
+    responses.add(responses.POST, URL)
+
+    compressor = jook.Compressor(threshold=0)
+    computer = jook.Computer(
+        URL, 'ComputerCheckIn', compressor=compressor)
+    computer.fire()
+
+    request = responses.calls[0].request
+    assert request.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(zlib.decompress(request.body, 16 + zlib.MAX_WBITS))
+
+
+def test_luhn_identifiers():
+    assert generators.luhn_check_digit('7992739871') == '3'
+
+    imei = generators.generate_imei()
+    assert len(imei) == 15
+    assert generators.luhn_check_digit(imei[:-1]) == imei[-1]
+
+    iccid = generators.generate_iccid()
+    assert len(iccid) == 20
+    assert generators.luhn_check_digit(iccid[:-1]) == iccid[-1]
+
+
+def test_realistic_device_data():
+    computer = jook.Computer(URL, 'ComputerAdded', realistic=True)
+    event = computer.data['event']
+
+    assert event['model'] in [m.name for m in generators.COMPUTER_MODELS]
+    assert event['osBuild']
+    assert event['deviceName'].endswith(computer.device.serial_number[-4:])
+    assert event['username'] in [
+        l.username for l in generators.location_table()]
+
+    mobile = jook.MobileDevice(
+        URL, 'MobileDeviceEnrolled',
+        device=jook.DeviceData('mobile', realistic=True, model='iPhone X'))
+    assert mobile.data['event']['model'] == 'iPhone X'
+    assert mobile.data['event']['osVersion']
+
+    for _ in range(50):
+        iphone = jook.DeviceData('mobile', realistic=True, model='iPhone X')
+        assert iphone.model_identifier == 'iPhone10,3'
+        assert iphone.device_name.startswith('iPhone ')
+        assert len(iphone.imei) == 15 and len(iphone.iccid) == 20
+
+        ipad = jook.DeviceData(
+            'mobile', realistic=True, model_identifier='iPad8,1')
+        assert ipad.model == 'iPad Pro (11-inch)'
+        assert ipad.imei == ipad.iccid == ''
+
+
+def test_location_table_is_shared():
+    first = [generators.generate_location() for _ in range(100)]
+    table = generators.location_table()
+
+    assert all(any(l is t for t in table) for l in first)
+    assert len(table) == \
+        len(generators.FIRST_NAMES) * len(generators.LAST_NAMES)
+
+
+def test_fleet_uniform_cardinality():
+    fleet = jook.Fleet(50, seed=1)
+    computer = jook.Computer(URL, 'ComputerCheckIn', fleet=fleet)
+
+    serials = set(computer.data['event']['serialNumber'] for _ in range(2000))
+    assert len(serials) == 50
+
+
+def test_fleet_zipf_skew():
+    fleet = jook.Fleet(10000, distribution='zipf', skew=1.2, seed=1)
+    picks = [fleet.pick() for _ in range(10000)]
+
+    assert all(0 <= index < 10000 for index in picks)
+    assert picks.count(0) > picks.count(1) > picks.count(100)
+
+    partition = jook.Fleet(
+        1000, distribution='zipf', skew=1.0, offset=1000, seed=1)
+    picks = [partition.pick() for _ in range(100000)]
+    assert picks.count(1000) < 3 * picks.count(1999)
+
+    with pytest.raises(InvalidMode):
+        jook.Fleet(10, distribution='normal')
+
+    with pytest.raises(JookException):
+        jook.Fleet(0)
+
+
+def test_fleet_device_seed():
+    first = jook.Fleet(
+        100, device_type='mobile', realistic=True, device_seed=7)
+    second = jook.Fleet(
+        50, device_type='mobile', realistic=True, device_seed=7, offset=50)
+
+    for index in (50, 99):
+        a, b = first.device(index), second.device(index)
+        assert (a.uuid, a.serial_number, a.mac_address, a.model, a.imei) == \
+            (b.uuid, b.serial_number, b.mac_address, b.model, b.imei)
+
+    assert first.device(50).uuid != first.device(51).uuid
+    assert jook.Fleet(100).device(50).uuid != first.device(50).uuid
+
+
+def test_fleet_growth():
+    now = [0.0]
+    fleet = jook.Fleet(
+        1000, growth=0.05, max_size=1100, clock=lambda: now[0])
+    assert fleet.size == 1000
+
+    now[0] = 3600.0
+    assert fleet.size == 1050
+
+    now[0] = 36000.0
+    assert fleet.size == 1100
+
+
+def test_prepare():
+    computer = jook.Computer(URL, 'ComputerCheckIn')
+    prepared = computer.prepare()
+
+    assert prepared.url == URL
+    assert prepared.headers == {'Content-Type': 'application/json'}
+    assert json.loads(prepared.body) == computer.data
+
+    with pytest.raises(AttributeError):
+        prepared.body = ''
+
+    with pytest.raises(TypeError):
+        prepared.headers['X-Test'] = '1'
+    assert 'X-Test' not in jook.JamfPro(URL, 'JSSStartup').prepare().headers
+
+    patch = jook.PatchTitle(URL, mode='xml')
+    assert patch.prepare().headers is patch.prepare().headers
+
+
+@responses.activate
+def test_senders_accept_prepared():
+    responses.add(responses.POST, URL)
+
+    prepared = jook.JamfPro(URL, 'JSSStartup').prepare()
+
+    jook.JamfPro(URL, 'JSSShutdown').fire(prepared)
+    jook.Sender().send(prepared)
+    jook.Jook(sender=jook.Sender()).fire([prepared, prepared])
+
+    sender = jook.AsyncSender(workers=2)
+    sender.submit(prepared).get()
+    sender.send_batch([prepared] * 3)
+    sender.close()
+
+    assert len(responses.calls) == 8
+    assert all(call.request.body == prepared.body for call in responses.calls)
+
+
+@responses.activate
+def test_jook_group():
+    responses.add(responses.POST, URL)
+
+    group = jook.Jook([
+        jook.Computer(URL, 'ComputerAdded'),
+        jook.MobileDevice(URL, 'MobileDeviceEnrolled', mode='xml')
+    ])
+    group.add(jook.PatchTitle(URL))
+
+    assert len(group.fire()) == 3
+    assert responses.calls[1].request.headers['Content-Type'] == 'text/xml'
+
+
+def test_smart_group_payloads():
+    group = jook.SmartGroup(
+        URL, 'SmartGroupMobileDeviceMembershipChange',
+        added=2500, removed=700, chunk_size=256,
+        fleet=jook.Fleet(10000, device_type='mobile', seed=1))
+
+    data = json.loads(group.to_json())
+    event = data['event']
+    assert data['webhook']['webhookEvent'] == group.event
+    assert event['computer'] is False
+    assert len(event['groupAddedDevicesIds']) == 2500
+    assert len(event['groupRemovedDevicesIds']) == 700
+    assert not set(event['groupAddedDevicesIds']) & \
+        set(event['groupRemovedDevicesIds'])
+    assert all(1 <= i <= 10000 for i in event['groupAddedDevicesIds'])
+
+    root = Et.fromstring(group.to_xml())
+    assert root.find('event/name').text == 'Smart Group'
+    assert len(root.findall('event/groupAddedDevicesIds/item')) == 2500
+    assert len(root.findall('event/groupRemovedDevicesIds/item')) == 700
+
+
+def test_smart_group_matches_data():
+    group = jook.SmartGroup(
+        URL, 'SmartGroupComputerMembershipChange', added=3, removed=2)
+
+    assert json.loads(group.to_json()) == group.data
+    assert group.data['event']['groupRemovedDevicesIds'] == [4, 5]
+
+    empty = jook.SmartGroup(
+        URL, 'SmartGroupComputerMembershipChange', added=0, mode='xml')
+    assert Et.fromstring(empty.prepare().body) is not None
+
+    with pytest.raises(JookException):
+        jook.SmartGroup(
+            URL, 'SmartGroupComputerMembershipChange', added=8, removed=3,
+            fleet=jook.Fleet(10))
+
+
+def test_latency_stats():
+    stats = LatencyStats()
+    for i in range(1, 101):
+        stats.record(i / 1000.0, error=i > 95)
+
+    assert stats.count == 100
+    assert stats.error_rate == 0.05
+    assert 0.045 <= stats.percentile(50) <= 0.055
+    assert stats.percentile(100) == 0.1
+
+    other = LatencyStats()
+    other.record(2.0)
+    stats.merge(other)
+    assert stats.count == 101
+    assert stats.max == 2.0
+
+
+def test_adaptive_load_finds_knee():
+    lock = threading.Lock()
+    in_flight = [0]
+
+    def receiver():
+        with lock:
+            in_flight[0] += 1
+            busy = in_flight[0] > 4
+        time.sleep(0.02 if busy else 0.002)
+        with lock:
+            in_flight[0] -= 1
+
+    result = AdaptiveLoad(receiver, step_duration=0.1, max_steps=20).run()
+
+    assert result.knee is not None
+    assert 3 <= result.knee.concurrency <= 4
+    assert any(step.degraded for step in result.steps)
+    assert all(step.degraded for step in result.steps
+               if step.concurrency > 4)
+
+
+def _rekey_shared_device(path, index, serial_number):
+    shared = jook.SharedFleet(path)
+    shared.device(index).set_serial_number(serial_number)
+    shared.flush()
+
+
+def test_shared_fleet(tmpdir):
+    path = str(tmpdir.join('fleet.bin'))
+    shared = jook.SharedFleet.create(
+        path, 20, device_type='mobile', realistic=True)
+
+    device = shared.device(3)
+    assert isinstance(device, jook.DeviceData)
+    assert len(device.serial_number) == 12
+    assert device.serial_number == shared.device(3).serial_number
+    assert shared.location(3).username
+
+    process = multiprocessing.Process(
+        target=_rekey_shared_device, args=(path, 3, 'FAKESERIAL01'))
+    process.start()
+    process.join()
+    assert device.serial_number == 'FAKESERIAL01'
+
+    mobile = jook.MobileDevice(
+        URL, 'MobileDeviceCheckIn',
+        fleet=jook.Fleet(100, device_type='mobile', store=shared))
+    assert mobile.fleet.size == 20
+    assert mobile.data['event']['model']
+
+    with pytest.raises(ValueError):
+        device.set_uuid('X' * 37)
+
+    uuid = shared.device(0).uuid
+    for index in (-1, 20):
+        with pytest.raises(IndexError):
+            shared.write('serial_number', index, 'ABCDEFGHIJKL')
+        with pytest.raises(IndexError):
+            shared.read('uuid', index)
+        with pytest.raises(IndexError):
+            shared.set_location(index, jook.LocationData())
+    assert shared.device(0).uuid == uuid
+
+
+class H2Receiver(object):
+    """A local h2c server that answers every request with ``status`` after
+    ``delay`` seconds and records the connections and request bodies it sees.
+    The first ``resets`` requests are answered with RST_STREAM instead, and
+    the first ``drops`` connections are closed at their first request.
+    """
+    def __init__(self, status=200, resets=0, delay=0, drops=0):
+        self.status = status
+        self.resets = resets
+        self.delay = delay
+        self.drops = drops
+        self.connections = 0
+        self.bodies = []
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(5)
+        self.url = 'http://127.0.0.1:{}/hook'.format(
+            self.sock.getsockname()[1])
+
+        thread = threading.Thread(target=self.accept)
+        thread.daemon = True
+        thread.start()
+
+    def accept(self):
+        while True:
+            client, _ = self.sock.accept()
+            self.connections += 1
+            thread = threading.Thread(target=self.serve, args=(client,))
+            thread.daemon = True
+            thread.start()
+
+    def respond(self, conn, client, lock, stream_id):
+        with lock:
+            if self.resets:
+                self.resets -= 1
+                conn.reset_stream(stream_id)
+            else:
+                conn.send_headers(
+                    stream_id, [(':status', str(self.status))],
+                    end_stream=True)
+            try:
+                client.sendall(conn.data_to_send())
+            except socket.error:
+                pass
+
+    def serve(self, client):
+        from h2.config import H2Configuration
+        from h2.connection import H2Connection
+        from h2 import events
+
+        conn = H2Connection(config=H2Configuration(client_side=False))
+        conn.initiate_connection()
+        client.sendall(conn.data_to_send())
+        lock = threading.Lock()
+        bodies = {}
+
+        while True:
+            data = client.recv(65536)
+            if not data:
+                break
+            with lock:
+                for event in conn.receive_data(data):
+                    if isinstance(event, events.DataReceived):
+                        bodies.setdefault(
+                            event.stream_id, []).append(event.data)
+                        conn.acknowledge_received_data(
+                            event.flow_controlled_length, event.stream_id)
+                    elif isinstance(event, events.StreamEnded):
+                        if self.drops:
+                            self.drops -= 1
+                            client.close()
+                            return
+                        self.bodies.append(
+                            b''.join(bodies.pop(event.stream_id, [])))
+                        timer = threading.Timer(
+                            self.delay, self.respond,
+                            (conn, client, lock, event.stream_id))
+                        timer.daemon = True
+                        timer.start()
+                client.sendall(conn.data_to_send())
+
+
+def test_http2_sender_multiplexes():
+    pytest.importorskip('h2')
+    from jook.http2 import HTTP2Sender
+
+    receiver = H2Receiver()
+    sender = HTTP2Sender(connections=2, max_streams=10)
+
+    prepared = [
+        jook.Computer(receiver.url, 'ComputerCheckIn').prepare()
+        for _ in range(50)
+    ]
+    large = jook.SmartGroup(
+        receiver.url, 'SmartGroupComputerMembershipChange',
+        added=30000).prepare()
+
+    group = jook.Jook(sender=sender)
+    responses = group.fire(prepared + [large])
+    sender.close()
+
+    assert len(responses) == 51
+    assert all(response.status_code == 200 for response in responses)
+    assert receiver.connections == 2
+    assert sorted(receiver.bodies) == sorted(
+        [p.body for p in prepared] + [large.body])
+
+
+def test_http2_sender_routes_by_receiver():
+    pytest.importorskip('h2')
+    from jook.http2 import HTTP2Sender
+
+    first, second = H2Receiver(status=200), H2Receiver(status=202)
+    sender = HTTP2Sender(connections=2)
+
+    prepared = [
+        jook.JamfPro(receiver.url, 'JSSStartup', webhook_id=i).prepare()
+        for i, receiver in enumerate([first, second] * 5)
+    ]
+    responses = jook.Jook(sender=sender).fire(prepared)
+    sender.close()
+
+    assert [r.status_code for r in responses] == [200, 202] * 5
+    assert sorted(first.bodies) == sorted(p.body for p in prepared[::2])
+    assert sorted(second.bodies) == sorted(p.body for p in prepared[1::2])
+
+
+def test_http2_sender_errors():
+    pytest.importorskip('h2')
+    from jook.http2 import HTTP2Sender
+    from jook.exceptions import ReceiverError
+
+    receiver = H2Receiver(status=503)
+    sender = HTTP2Sender()
+
+    with pytest.raises(ReceiverError):
+        sender.send(jook.JamfPro(receiver.url, 'JSSStartup').prepare())
+    sender.close()
+
+
+def test_http2_sender_concurrent_sends():
+    pytest.importorskip('h2')
+    from jook.http2 import HTTP2Sender
+
+    receiver = H2Receiver(delay=0.2)
+    sender = HTTP2Sender()
+    prepared = jook.JamfPro(receiver.url, 'JSSStartup').prepare()
+    responses = []
+
+    def send():
+        responses.append(sender.send(prepared))
+
+    threads = [threading.Thread(target=send) for _ in range(10)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+    sender.close()
+
+    # Sent one at a time the requests would take two seconds.
+    assert len(responses) == 10
+    assert elapsed < 1.0
+    assert receiver.connections == 1
+
+
+def test_http2_sender_stream_reset():
+    pytest.importorskip('h2')
+    from jook.http2 import HTTP2Sender
+
+    receiver = H2Receiver(resets=1)
+    sender = HTTP2Sender()
+    prepared = jook.JamfPro(receiver.url, 'JSSStartup').prepare()
+
+    with pytest.raises(JookException):
+        sender.send_batch([prepared] * 20)
+
+    # A reset only fails its own stream; the connection stays usable.
+    responses = sender.send_batch([prepared] * 20)
+    sender.close()
+
+    assert all(response.status_code == 200 for response in responses)
+    assert receiver.connections == 1
+
+
+def test_http2_sender_reconnects_after_failure():
+    pytest.importorskip('h2')
+    from jook.http2 import HTTP2Sender
+
+    receiver = H2Receiver(drops=1)
+    sender = HTTP2Sender()
+    prepared = jook.JamfPro(receiver.url, 'JSSStartup').prepare()
+
+    with pytest.raises(JookException):
+        sender.send_batch([prepared] * 20)
+
+    responses = sender.send_batch([prepared] * 20)
+    sender.close()
+
+    assert all(response.status_code == 200 for response in responses)
+    assert receiver.connections == 2
+
+
+class FlakySender(object):
+    """Fails every third request, after an optional ``delay`` in seconds."""
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.sent = 0
+        self.lock = threading.Lock()
+
+    def send(self, prepared):
+        time.sleep(self.delay)
+        with self.lock:
+            self.sent += 1
+            sent = self.sent
+        if sent % 3 == 0:
+            raise ValueError('request {} failed'.format(sent))
+
+
+def test_soak_rollups(tmpdir):
+    path = str(tmpdir.join('rollups.jsonl'))
+    sender = FlakySender()
+    soak = Soak(
+        jook.Computer(URL, 'ComputerCheckIn'), sender=sender, rate=200,
+        window=0.1, rollup_path=path, error_samples=2, history=2)
+    soak.run(duration=0.45)
+
+    with open(path) as fobj:
+        rollups = [json.loads(line) for line in fobj]
+
+    assert len(rollups) >= 4
+    assert sum(r['count'] for r in rollups) == sender.sent
+    assert 50 <= sender.sent <= 100
+    assert all(len(r['errorSamples']) <= 2 for r in rollups)
+    assert rollups[0]['rssBytes'] > 0
+    assert rollups[0]['generationSeconds'] > 0
+    assert len(soak.rollups) == 2
+
+
+def test_soak_schedule():
+    sender = FlakySender()
+    soak = Soak(
+        jook.JamfPro(URL, 'JSSStartup'), sender=sender,
+        schedule=lambda elapsed: 0 if elapsed < 0.1 else 100, window=1)
+    soak.run(duration=0.2)
+
+    assert 5 <= sender.sent <= 15
+
+
+def test_soak_latency_includes_queueing():
+    webhook = jook.JamfPro(URL, 'JSSStartup')
+
+    pooled = FlakySender(delay=0.05)
+    Soak(webhook, sender=pooled, rate=100, concurrency=8).run(duration=0.5)
+    assert pooled.sent >= 40
+
+    # One thread can only send 20 a second, so events fall further behind
+    # their schedule and the wait is reported as latency.
+    single = Soak(
+        webhook, sender=FlakySender(delay=0.05), rate=100, concurrency=1)
+    single.run(duration=0.5)
+    assert single.rollups[-1]['max'] > 0.2
+
+
+@responses.activate
+def test_soak_default_sender_pool():
+    responses.add(responses.POST, URL)
+
+    soak = Soak(jook.JamfPro(URL, 'JSSStartup'), rate=None, concurrency=25)
+    soak.run(count=5)
+
+    adapter = soak.sender.session.get_adapter(URL)
+    assert adapter._pool_maxsize == 25
+    assert len(responses.calls) == 5
+
+
+def test_profiler_breakdown():
+    original = BaseWebhook.to_json
+    computer = jook.Computer(URL, 'ComputerCheckIn', randomize=True)
+    patch = jook.PatchTitle(URL, mode='xml')
+
+    with Profiler() as profiler:
+        for _ in range(10):
+            computer.prepare()
+            patch.prepare()
+
+        with pytest.raises(JookException):
+            Profiler().start()
+
+    assert BaseWebhook.to_json == original
+
+    report = profiler.report()
+    computer_stages = report['ComputerCheckIn']
+    assert computer_stages['data']['calls'] == 10
+    assert computer_stages['serialize']['calls'] == 10
+    assert computer_stages['identifiers']['calls'] == 40
+    assert computer_stages['prepare']['seconds'] >= 0
+    assert report['PatchSoftwareTitleUpdated']['data']['calls'] == 10
+    assert 'ComputerCheckIn' in profiler.format_report()
+
+
+@responses.activate
+def test_profiler_network():
+    responses.add(responses.POST, URL)
+    startup = jook.JamfPro(URL, 'JSSStartup')
+    computer = jook.Computer(URL, 'ComputerCheckIn')
+    prepared = [startup.prepare(), computer.prepare(), computer.prepare()]
+    sender = jook.AsyncSender(workers=2)
+
+    with Profiler() as profiler:
+        jook.Jook([startup, computer]).fire()
+        sender.send_batch(prepared)
+    sender.close()
+
+    report = profiler.report()
+    assert report['JSSStartup']['network']['calls'] == 2
+    assert report['ComputerCheckIn']['network']['calls'] == 3
+    assert 'network' not in report.get('-', {})
+
+
+def test_profiler_network_batch():
+    pytest.importorskip('h2')
+    from jook.http2 import HTTP2Sender
+
+    receiver = H2Receiver()
+    sender = HTTP2Sender()
+    prepared = [
+        jook.JamfPro(receiver.url, 'JSSStartup').prepare(),
+        jook.Computer(receiver.url, 'ComputerCheckIn').prepare()
+    ]
+
+    with Profiler() as profiler:
+        jook.Jook(sender=sender).fire(prepared * 2)
+    sender.close()
+
+    report = profiler.report()
+    assert report['JSSStartup']['network']['calls'] == 2
+    assert report['ComputerCheckIn']['network']['calls'] == 2
+    assert report['JSSStartup']['network']['seconds'] > 0
+
+
+def test_profiler_sampling_off_main_thread():
+    original = BaseWebhook.to_json
+    errors = []
+
+    def start():
+        try:
+            Profiler(sample_interval=0.001).start()
+        except JookException as err:
+            errors.append(err)
+
+    thread = threading.Thread(target=start)
+    thread.start()
+    thread.join()
+
+    assert len(errors) == 1
+    assert BaseWebhook.to_json == original
+
+    with Profiler():
+        assert BaseWebhook.to_json != original
+    assert BaseWebhook.to_json == original
+
+
+def test_profiler_sampling():
+    computer = jook.Computer(URL, 'ComputerAdded', randomize=True)
+
+    with Profiler(sample_interval=0.001) as profiler:
+        start = time.time()
+        while time.time() - start < 0.3:
+            computer.to_xml()
+
+    assert sum(profiler.samples.values()) > 0
+    assert profiler.hotspots
+
+
+class CountingHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.server.bodies.append(self.path)
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_distributed_local_workers():
+    server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), CountingHandler)
+    server.bodies = []
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    coordinator = Coordinator(
+        scenario={
+            'webhook': 'Computer',
+            'url': 'http://127.0.0.1:{}/'.format(server.server_port),
+            'event': 'ComputerCheckIn',
+            'realistic': True
+        },
+        workers=2, fleet_size=1000, fleet_options={'distribution': 'zipf'},
+        count=41, report_interval=0.01)
+
+    tasks = coordinator.tasks()
+    assert [t['fleet']['size'] for t in tasks] == [1000, 1000]
+    assert sum(t['count'] for t in tasks) == 41
+    assert [t['device_seed'] for t in tasks] == [0, 0]
+
+    processes = start_local_workers(coordinator.address, 2)
+    result = coordinator.run(timeout=30)
+    for process in processes:
+        process.join()
+    server.shutdown()
+
+    assert result.stats.count == 41
+    assert result.stats.errors == 0
+    assert sorted(s.count for s in result.workers.values()) == [20, 21]
+    assert len(server.bodies) == 41
+
+
+def test_distributed_fleet_distribution():
+    def combined(distribution):
+        coordinator = Coordinator(
+            scenario={}, workers=4, fleet_size=4000, count=1,
+            fleet_options={'distribution': distribution})
+        coordinator._sock.close()
+
+        counts = {}
+        for task in coordinator.tasks():
+            options = dict(task['fleet'])
+            fleet = jook.Fleet(
+                options.pop('size'), seed=task['seed'], **options)
+            for _ in range(5000):
+                index = fleet.pick()
+                counts[index] = counts.get(index, 0) + 1
+        return counts
+
+    # One Zipf curve over the whole fleet: P(0) = 1 / H(4000).
+    counts = combined('zipf')
+    head = 1 / sum(1.0 / rank for rank in range(1, 4001))
+    assert abs(counts[0] / 20000.0 - head) < 0.01
+    assert counts.get(1000, 0) < 20
+
+    counts = combined('uniform')
+    assert len(counts) > 3500
+    assert min(counts) == 0 and max(counts) == 3999
+
+
+def test_distributed_fleet_partitions():
+    with pytest.raises(JookException):
+        Coordinator(scenario={}, workers=4, fleet_size=3, count=1)
+    with pytest.raises(JookException):
+        Coordinator(scenario={}, workers=2, fleet_size=100, count=1,
+                    fleet_options={'growth': 0.5})
+
+    # Zipf workers share the whole fleet, so both are allowed.
+    coordinator = Coordinator(
+        scenario={}, workers=4, fleet_size=3, count=1,
+        fleet_options={'distribution': 'zipf', 'growth': 0.5})
+    coordinator._sock.close()
+    assert [task['fleet']['size'] for task in coordinator.tasks()] == [3] * 4
+
+
+def test_distributed_worker_errors():
+    coordinator = Coordinator(
+        scenario={'webhook': 'Printer', 'url': URL, 'event': 'PrinterAdded'},
+        workers=1, count=1)
+
+    worker = threading.Thread(
+        target=Worker(*coordinator.address).run)
+    worker.start()
+
+    with pytest.raises(JookException):
+        coordinator.run(timeout=30)
+    worker.join()
+
+
+def test_latency_stats_compact():
+    stats = LatencyStats()
+    for i in range(10):
+        stats.record(i / 100.0, error=i == 0)
+
+    copy = LatencyStats.from_compact(json.loads(json.dumps(stats.compact())))
+    assert copy.as_dict() == stats.as_dict()
+
+
+def test_payload_shape_fields():
+    shape = jook.PayloadShape(
+        pad_fields=('serialNumber',), pad_length=500,
+        unicode_names=True, unicode_length=300)
+    computer = jook.Computer(
+        URL, 'ComputerCheckIn', realistic=True, shape=shape)
+
+    event = json.loads(computer.prepare().body)['event']
+    assert len(event['serialNumber']) == 512
+    assert len(event['realName']) == 300
+    assert u'山田太郎' in event['realName']
+
+    root = Et.fromstring(jook.MobileDevice(
+        URL, 'MobileDeviceCheckIn', mode='xml', shape=shape).to_xml())
+    assert len(root.find('event/username').text) == 300
+
+
+def test_payload_shape_size_and_depth():
+    events = (
+        jook.Computer(URL, 'ComputerAdded'),
+        jook.JamfPro(URL, 'JSSStartup'),
+        jook.PatchTitle(URL),
+        jook.SmartGroup(URL, 'SmartGroupComputerMembershipChange', added=50)
+    )
+    shape = jook.PayloadShape(depth=50, target_size=64 * 1024)
+
+    for event in events:
+        event.shape = shape
+
+        body = event.to_json()
+        assert len(body) == 64 * 1024
+        data = json.loads(body)
+        for _ in range(49):
+            data = data['nested']
+        assert data['nested'] == {}
+
+        event.mode = 'xml'
+        body = event.prepare().body
+        assert len(body) == 64 * 1024
+        root = Et.fromstring(body)
+        assert len(root.findall('.//nested')) == 50
+        assert root.find('padding') is not None
+
+
+def test_payload_shape_filler_bounded():
+    shape = jook.PayloadShape(target_size=16 * 1024)
+    fleet = jook.Fleet(50, realistic=True, seed=1)
+    computer = jook.Computer(
+        URL, 'ComputerCheckIn', fleet=fleet, shape=shape)
+
+    sizes = set()
+    for _ in range(100):
+        body = computer.prepare().body
+        assert len(body) == 16 * 1024
+        sizes.add(body.index(b'"padding"'))
+
+    # Bodies of many sizes all share one filler.
+    assert len(sizes) > 1
+    assert len(shape._padding) == 16 * 1024
+
+
+def test_payload_shape_profiles():
+    computer = jook.Computer(
+        URL, 'ComputerInventoryCompleted', mode='xml',
+        shape=shapes.PROFILES['deep'])
+    assert Et.fromstring(computer.to_xml()) is not None
+
+    computer.shape = shapes.PROFILES['padded']
+    assert len(computer.to_xml()) > 4096 * 10
+
+    with pytest.raises(JookException):
+        jook.PayloadShape(target_size=-1)